@@ -1,12 +1,14 @@
 # Main Application - Multi-Source Pathway Pipeline
 
+import asyncio
+import os
+import json
 import threading
 import time
-from collections import deque
 from pathlib import Path
 import yaml
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import HTMLResponse
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import HTMLResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from dotenv import load_dotenv
@@ -16,10 +18,11 @@ load_dotenv()
 
 # Connectors (Classes & Functions)
 from ingest.newsdata_connector import fetch_category as fetch_category_newsdata
-from ingest.gnews_connector import GNewsConnector, search_historical
+from ingest.gnews_connector import GNewsConnector
 from ingest.reddit_stream import RedditConnector
 from ingest.hackernews_stream import HackerNewsConnector
-from ingest.firecrawl_connector import FirecrawlConnector, scrape_targeted
+from ingest.firecrawl_connector import FirecrawlConnector
+from ingest.on_demand import fetch_on_demand, persist_in_background, on_demand_cache
 from ingest.opml_loader import OPMLIngestor, DEFAULT_OPML_URLS
 
 # ... 
@@ -36,35 +39,63 @@ from ingest.opml_loader import OPMLIngestor, DEFAULT_OPML_URLS
 
 
 # AI Pipeline
-from pipeline.gemini_rag import pathway_rag_query
+from pipeline.gemini_rag import pathway_rag_query, pathway_rag_stream, close_llm_clients, RETRIEVAL_CANDIDATES
 
 # Data Persistence
 from data.database import save_articles_batch, search_history
 
+# Article record + indexed live window
+from ingest.article import Article, to_dicts
+from pipeline.live_index import LiveIndex, query_terms, term_hits
+from pipeline.answer_cache import AnswerCache, normalize_query
+from pipeline.singleflight import SingleFlight
+from pipeline.timing import StageTimer, LatencyStats
+from pipeline.scheduler import QueryScheduler, SchedulerBusy
+from pipeline.llm_router import llm_router
+from pipeline.topic_briefings import TopicBriefings, TOPIC_KEYWORDS
+from pipeline.embedding_worker import get_embedding_worker
+from pipeline.embedding_indexer import embedding_indexer
+
 # Data Store
 data_store = {
-    "items": deque(maxlen=500),  # Increased for OPML volume
+    # Ids start at the clock (ms) so they keep increasing across restarts -
+    # stored briefings compare against them
+    "items": LiveIndex(maxlen=500, first_id=time.time_ns() // 1_000_000),  # Increased for OPML volume
     "stats": {"news": 0, "social": 0, "opml": 0}
 }
 data_lock = threading.Lock()
+# (loop, asyncio.Event) per /query waiting for fresh items; guarded by data_lock
+fresh_waiters = set()
+
+def notify_fresh_waiters():
+    """Wake async /query freshness waits. Call with data_lock held, after appending."""
+    for loop, event in fresh_waiters:
+        loop.call_soon_threadsafe(event.set)
+
+# Answers are reused until a new live item matches the question
+answer_cache = AnswerCache()
+# Concurrent identical questions share one pipeline run
+inflight_queries = SingleFlight()
+query_latency = LatencyStats()
+query_scheduler = QueryScheduler()
+briefings_task = None
+
+# /query freshness wait: return as soon as N new relevant items arrive, or at the deadline
+QUERY_WAIT_SECONDS = float(os.getenv("QUERY_WAIT_SECONDS", "1.5"))
+QUERY_WAIT_MIN_ITEMS = int(os.getenv("QUERY_WAIT_MIN_ITEMS", "3"))
+# Set to 0 to never call the live web fallback (offline benchmarks)
+QUERY_WEB_FALLBACK = os.getenv("QUERY_WEB_FALLBACK", "1") != "0"
 
 def run_connector(generator, source_name):
     print(f"📡 Starting stream: {source_name}")
     batch_buffer = []
     last_save = time.time()
     
-    # DISABLED: Vector store causes mutex lock issues with sentence_transformers
-    # Vector indexing will happen during RAG query instead (lazy indexing)
-    # from pipeline.vector_store import get_vector_store
-    # vs = get_vector_store()
-        
     try:
-        for item in generator:
+        for raw in generator:
+            item = Article.from_raw(raw)
             if item:
                 with data_lock:
-                    if "reliability" not in item:
-                        item["reliability"] = "Unknown"
-                    
                     data_store["items"].append(item)
                     
                     if source_name in ['newsdata', 'gnews', 'newsapi']:
@@ -73,10 +104,11 @@ def run_connector(generator, source_name):
                         data_store["stats"]["opml"] += 1
                     else:
                         data_store["stats"]["social"] += 1
+                    
+                    notify_fresh_waiters()
                 
-                # ========== VECTOR INDEXING DISABLED (CAUSES MUTEX LOCK) ==========
-                # Indexing moved to RAG query time to avoid startup locks
-                # ================================================================
+                # Embed in the background (batched), never on the query path
+                embedding_indexer.submit(item)
                 
                 # Buffer for DB save (batch is OK for DB)
                 batch_buffer.append(item)
@@ -121,6 +153,25 @@ def startup():
     threading.Thread(target=run_connector, args=(global_opml.run(), "opml"), daemon=True).start()
     
     print("✅ All streams active (Twitter + OPML + GNews + HackerNews)")
+    
+    # 🧬 Embedding worker process: model loads in the background, vector search turns on when ready
+    get_embedding_worker()
+    # Ingest-time embedding + resumable archive backfill
+    embedding_indexer.start()
+
+@app.on_event("startup")
+async def start_topic_briefings():
+    global briefings_task
+    briefings_task = asyncio.create_task(topic_briefings.run())
+
+@app.on_event("shutdown")
+async def shutdown():
+    if briefings_task is not None:
+        briefings_task.cancel()
+    await close_llm_clients()
+    worker = get_embedding_worker()
+    if worker:
+        worker.stop()
 
 # --- NEW ENDPOINT FOR DYNAMIC CATEGORIES ---
 class CategoryRequest(BaseModel):
@@ -133,6 +184,7 @@ def fetch_news_endpoint(req: CategoryRequest):
     # 1. Fetch from NewsData.io (replacing rate-limited NewsAPI)
     # 1. Fetch from NewsData.io -> DISABLED
     items = [] # fetch_category_newsdata(req.category)
+    items = [a for a in map(Article.from_raw, items) if a]
     
     # 2. Persist to DB for future use
     if items:
@@ -144,8 +196,9 @@ def fetch_news_endpoint(req: CategoryRequest):
             for item in items:
                 data_store["items"].append(item)
                 data_store["stats"]["news"] += 1
+            notify_fresh_waiters()
                 
-    return {"items": items}
+    return {"items": to_dicts(items)}
 
 
 
@@ -161,6 +214,7 @@ def dashboard():
 
 class QueryRequest(BaseModel):
     query: str
+    fast: bool = False  # Skip the freshness wait and answer from what is already live
 
 @app.post("/refresh_opml")
 def refresh_opml_endpoint():
@@ -170,51 +224,86 @@ def refresh_opml_endpoint():
         return {"status": "triggered"}
     return {"status": "error", "message": "OPML ingestor not active"}
 
-@app.post("/query")
-def query_endpoint(req: QueryRequest):
+async def wait_for_fresh_matches(terms: list, since_id: int, min_items: int, timeout: float) -> int:
+    """
+    Wait until `min_items` new items matching `terms` have been appended after
+    `since_id`, or until `timeout` seconds pass. Returns the number of new matches.
+    Woken by connector threads (notify_fresh_waiters) without holding a thread.
+    """
+    loop = asyncio.get_running_loop()
+    waiter = (loop, asyncio.Event())
+    deadline = loop.time() + timeout
+    checked_id = since_id
+    found = 0
+    
+    with data_lock:
+        fresh_waiters.add(waiter)
+    try:
+        while True:
+            with data_lock:
+                # Only inspect items that arrived since the last wake-up
+                for item in data_store["items"].items_since(checked_id):
+                    if term_hits(item.tokens, terms):
+                        found += 1
+                checked_id = data_store["items"].last_id
+                waiter[1].clear()
+            
+            remaining = deadline - loop.time()
+            if found >= min_items or remaining <= 0:
+                return found
+            try:
+                await asyncio.wait_for(waiter[1].wait(), remaining)
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        with data_lock:
+            fresh_waiters.discard(waiter)
+
+async def gather_query_context(req: QueryRequest, timer: StageTimer):
+    """
+    Retrieval stages of /query (refresh wait, live filter, DB history, web fallback),
+    each timed on `timer`.
+    Returns (unique_context, archive, meta, live_ids): unique_context holds the
+    live and on-demand candidates, archive the one archive search (ranked by
+    the RAG pipeline as its own retriever, not mixed into the candidates),
+    meta the response metadata fields, live_ids the ids of the live items
+    that matched (answer cache key).
+    """
     print(f"🔎 Received Query: {req.query}")
     used_web_fallback = False
     
+    terms = query_terms(req.query)
+    
     # === STEP 0: TRIGGER OPML REFRESH for fresh real-time data ===
-    print("⚡ Triggering OPML refresh for fresh data...")
-    if 'global_opml' in globals() and global_opml:
+    if not req.fast and 'global_opml' in globals() and global_opml:
+        print("⚡ Triggering OPML refresh for fresh data...")
+        with data_lock:
+            since_id = data_store["items"].last_id
         global_opml.manual_refresh()
+        
+        # Wait for fresh relevant items (returns early once enough arrive)
+        with timer.stage("refresh_wait"):
+            new_matches = await wait_for_fresh_matches(terms, since_id, QUERY_WAIT_MIN_ITEMS, QUERY_WAIT_SECONDS)
+        print(f"⏱️ Freshness wait: {new_matches} new matches in {timer.stages['refresh_wait']:.2f}s")
     
-    # Small delay to let OPML fetch some fresh items
-    import time
-    time.sleep(1.5)
-    
-    # === STEP 1: Get snapshot of live stream (PRIMARY SOURCE) ===
-    with data_lock:
+    # === STEP 1: Snapshot live stream + relevance lookup via inverted index (PRIMARY SOURCE) ===
+    with timer.stage("live_filter"), data_lock:
         live_snapshot = list(data_store["items"])
+        live_ids = frozenset(data_store["items"].match(terms))
+        relevant_live = [data_store["items"].get(i) for i in sorted(live_ids)]
     print(f"📊 Live stream snapshot: {len(live_snapshot)} items")
     
-    # === STEP 2: Separate OPML items (PRIORITY) from other items ===
-    opml_items = [i for i in live_snapshot if i.get('source') == 'opml']
-    other_items = [i for i in live_snapshot if i.get('source') != 'opml']
-    print(f"📰 OPML items: {len(opml_items)} | Other items: {len(other_items)}")
-    
-    # === STEP 3: Pre-filter for relevance ===
-    query_words = set(req.query.lower().split())
-    
-    # Filter OPML items for relevance
-    relevant_opml = []
-    for item in opml_items:
-        text = (item.get('text', '') + ' ' + item.get('url', '')).lower()
-        if any(word in text for word in query_words):
-            relevant_opml.append(item)
-    
-    # Filter other items for relevance
-    relevant_other = []
-    for item in other_items:
-        text = (item.get('text', '') + ' ' + item.get('url', '')).lower()
-        if any(word in text for word in query_words):
-            relevant_other.append(item)
+    # === STEP 2/3: Separate OPML items (PRIORITY) from other items ===
+    opml_items = [i for i in live_snapshot if i.source == 'opml']
+    relevant_opml = [i for i in relevant_live if i.source == 'opml']
+    relevant_other = [i for i in relevant_live if i.source != 'opml']
+    print(f"📰 OPML items: {len(opml_items)} | Other items: {len(live_snapshot) - len(opml_items)}")
     
     print(f"🎯 Relevant OPML: {len(relevant_opml)} | Relevant Other: {len(relevant_other)}")
     
-    # === STEP 4: Get DB history (always available) ===
-    db_history = search_history(req.query, limit=10)
+    # === STEP 4: Get DB history (always available) - the only archive search per query ===
+    with timer.stage("history"):
+        db_history = await asyncio.to_thread(search_history, req.query, RETRIEVAL_CANDIDATES)
     print(f"📚 DB History matches: {len(db_history)}")
     
     # === STEP 5: Determine if we need web fallback ===
@@ -222,28 +311,25 @@ def query_endpoint(req: QueryRequest):
     MIN_RELEVANT_THRESHOLD = 3
     
     total_relevant = len(relevant_opml) + len(relevant_other) + len(db_history)
-    if total_relevant < MIN_RELEVANT_THRESHOLD and len(req.query) > 3:
+    if QUERY_WEB_FALLBACK and total_relevant < MIN_RELEVANT_THRESHOLD and len(req.query) > 3:
         print("⚠️ Insufficient live data, triggering web fallback...")
         used_web_fallback = True
         
-        # Trigger GNews Historical Search
-        hist_news = search_historical(req.query, days=1000)
-        
-        # Trigger Firecrawl Targeted Scrape (BACKUP)
-        web_results = scrape_targeted(req.query)
-        
-        on_demand_items = hist_news + web_results
+        # GNews historical search + Firecrawl targeted scrape, in parallel under one deadline
+        with timer.stage("fallback"):
+            on_demand_items = await fetch_on_demand(req.query, enough=MIN_RELEVANT_THRESHOLD)
         
-        # Persist these new findings for future use!
+        # Persist these new findings for future use! (off the request path)
         if on_demand_items:
-            saved = save_articles_batch(on_demand_items)
-            print(f"💾 Persisted {saved} new on-demand items")
+            persist_in_background(on_demand_items, save_articles_batch)
+            print(f"💾 Persisting {len(on_demand_items)} on-demand items")
     else:
         print("✅ Sufficient live data, skipping web fallback")
 
-    # === STEP 6: Combine all contexts - OPML FIRST (PRIORITY) ===
-    # NEW Priority Order: [Relevant OPML] > [All OPML] > [Relevant Other] > [On-Demand] > [DB History]
-    full_context = relevant_opml + opml_items + relevant_other + on_demand_items + db_history
+    # === STEP 6: Combine live contexts - OPML FIRST (PRIORITY) ===
+    # Priority Order: [Relevant OPML] > [All OPML] > [Relevant Other] > [On-Demand]
+    # DB history goes to the RAG pipeline separately, as the archive ranking
+    full_context = relevant_opml + opml_items + relevant_other + on_demand_items
     
     # Deduplicate by URL
     seen_urls = set()
@@ -256,18 +342,236 @@ def query_endpoint(req: QueryRequest):
     
     # Count OPML vs other for logging
     opml_count = sum(1 for i in unique_context if i.get('source') == 'opml')
-    print(f"🧠 Processing {len(unique_context)} items for AI (OPML: {opml_count} prioritized)...")
+    print(f"🧠 Processing {len(unique_context)} live + {len(db_history)} archived items for AI (OPML: {opml_count} prioritized)...")
     
-    # === STEP 7: Run RAG ===
-    result = pathway_rag_query(unique_context, req.query)
-    
-    # === STEP 8: Add metadata to response ===
-    result["used_web_fallback"] = used_web_fallback
-    result["live_matches"] = len(relevant_opml) + len(relevant_other)
-    result["opml_used"] = opml_count
+    meta = {
+        "used_web_fallback": used_web_fallback,
+        "live_matches": len(relevant_opml) + len(relevant_other),
+        "opml_used": opml_count
+    }
+    return unique_context, db_history, meta, live_ids
+
+def cached_answer(query: str):
+    """Return (cache_key, cached result or None) for the current live window."""
+    key = normalize_query(query)
+    with data_lock:
+        live_ids = frozenset(data_store["items"].match(query_terms(query)))
+    return key, answer_cache.get(key, live_ids)
+
+def client_id(request: Request) -> str:
+    """Identity used for per-client fairness (first proxy hop if behind one)."""
+    forwarded = request.headers.get("x-forwarded-for")
+    if forwarded:
+        return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+def busy_response(busy: SchedulerBusy) -> HTTPException:
+    print(f"🚦 Shedding query: {busy.reason}")
+    return HTTPException(status_code=503, detail={"error": "busy", "reason": busy.reason,
+                                                  "retry_after": busy.retry_after},
+                         headers={"Retry-After": str(busy.retry_after)})
+
+async def run_until_disconnect(request: Request, coro, poll_interval: float = 0.5):
+    """
+    Await `coro`, cancelling it if the HTTP client disconnects first.
+    Returns (result, disconnected).
+    """
+    task = asyncio.ensure_future(coro)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=poll_interval)
+            if done:
+                return task.result(), False
+            if await request.is_disconnected():
+                task.cancel()
+                return None, True
+    except asyncio.CancelledError:
+        task.cancel()
+        raise
+
+@app.post("/query")
+async def query_endpoint(req: QueryRequest, request: Request):
+    timer = StageTimer()
+    # === Answer cache: reuse while no new live item matches the question ===
+    cache_key, cached = cached_answer(req.query)
+    if cached:
+        print(f"⚡ Answer cache hit for '{cache_key}' ({cached['cache_age']}s old)")
+        total = timer.as_dict()["total"]
+        # `total` too, so the end-to-end histogram includes the fastest responses
+        cached["timings"] = {"cache_hit": total, "total": total}
+        query_latency.record(cached["timings"])
+        return cached
+    
+    client = client_id(request)
+    
+    async def run_pipeline():
+        # === Admission control: bounded LLM-bound concurrency, fair per client ===
+        with timer.stage("queue_wait"):
+            await query_scheduler.acquire(client)
+        slot_started = time.monotonic()
+        try:
+            unique_context, archive, meta, live_ids = await gather_query_context(req, timer)
+            
+            # === STEP 7: Run RAG ===
+            result = await pathway_rag_query(unique_context, req.query, timer, archive)
+        finally:
+            query_scheduler.release(client, time.monotonic() - slot_started)
+        
+        # === STEP 8: Add metadata to response ===
+        result.update(meta)
+        result["timings"] = timer.as_dict()
+        query_latency.record(result["timings"])
+        answer_cache.put(cache_key, live_ids, result)
+        return result
+    
+    # === Single-flight: identical in-flight questions attach to one run ===
+    # Only a run this client leads is charged to it; if the run we attached
+    # to was shed (its leader's quota / queue), start our own instead.
+    for attempt in range(2):
+        leading = inflight_queries.running(cache_key) is None
+        try:
+            if leading:
+                query_scheduler.check(client)
+            outcome, disconnected = await run_until_disconnect(request, inflight_queries.do(cache_key, run_pipeline))
+        except SchedulerBusy as busy:
+            if leading or attempt:
+                raise busy_response(busy)
+            print(f"♻️ Shared run for '{cache_key}' was shed ({busy.reason}), running our own")
+            continue
+        break
+    if disconnected:
+        print(f"🔌 Client disconnected, cancelled query '{cache_key}'")
+        return {"error": "client disconnected", "answer": None}
+    result, shared = outcome
+    if shared:
+        print(f"🔗 Coalesced with in-flight query '{cache_key}'")
+        result["coalesced"] = True
+        # The leader recorded its own run; count this request's wait as well
+        total = timer.as_dict()["total"]
+        query_latency.record({"coalesced": total, "total": total})
         
     return result
 
+def sse_event(event: str, data: dict) -> str:
+    """Format one Server-Sent Events frame."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.post("/query/stream")
+async def query_stream_endpoint(req: QueryRequest, request: Request):
+    """
+    Streaming /query over Server-Sent Events:
+    'retrieval' (sources + match counts) is sent as soon as context is built,
+    then one 'token' frame per model chunk, then a 'final' frame with the
+    validated JSON answer and the same metadata as /query.
+    The stream is cancelled (including the LLM call) if the client disconnects.
+    Overload is rejected with 503 before the stream starts; a queue timeout
+    after that arrives as a 'busy' event.
+    """
+    timer = StageTimer()
+    client = client_id(request)
+    cache_key, cached = cached_answer(req.query)
+    running = inflight_queries.running(cache_key)
+    if not cached and running is None:
+        try:
+            query_scheduler.check(client)
+        except SchedulerBusy as busy:
+            raise busy_response(busy)
+    
+    async def run_stream(queue: asyncio.Queue):
+        """Leader run: streams retrieval/token frames into `queue`, returns the final payload."""
+        with timer.stage("queue_wait"):
+            await query_scheduler.acquire(client)
+        slot_started = time.monotonic()
+        try:
+            unique_context, archive, meta, live_ids = await gather_query_context(req, timer)
+            async for event, payload in pathway_rag_stream(unique_context, req.query, timer, archive):
+                if event != "token":
+                    payload.update(meta)
+                if event == "final":
+                    payload["timings"] = timer.as_dict()
+                    query_latency.record(payload["timings"])
+                    answer_cache.put(cache_key, live_ids, payload)
+                    return payload
+                queue.put_nowait(sse_event(event, payload))
+        finally:
+            query_scheduler.release(client, time.monotonic() - slot_started)
+    
+    async def events():
+        if cached:
+            total = timer.as_dict()["total"]
+            cached["timings"] = {"cache_hit": total, "total": total}
+            query_latency.record(cached["timings"])
+            yield sse_event("final", cached)
+            return
+        
+        # === Single-flight: same registry and waiter accounting as /query ===
+        # The leader streams its frames; requests that attach (from /query or
+        # /query/stream) get the shared final answer.
+        for attempt in range(2):
+            queue = asyncio.Queue()
+            leading = inflight_queries.running(cache_key) is None
+            flight = asyncio.ensure_future(inflight_queries.do(cache_key, lambda: run_stream(queue)))
+            try:
+                while not flight.done():
+                    getter = asyncio.ensure_future(queue.get())
+                    await asyncio.wait({getter, flight}, return_when=asyncio.FIRST_COMPLETED)
+                    if getter.done():
+                        yield getter.result()
+                    else:
+                        getter.cancel()
+                while not queue.empty():
+                    yield queue.get_nowait()
+                
+                try:
+                    final, shared = flight.result()
+                except asyncio.CancelledError:
+                    # The run we attached to was abandoned by its own clients - run our own
+                    print(f"♻️ Shared run for '{cache_key}' was cancelled, restarting")
+                    continue
+                except SchedulerBusy as busy:
+                    if not leading and not attempt:
+                        # Another client's run was shed - that is not our 503
+                        print(f"♻️ Shared run for '{cache_key}' was shed ({busy.reason}), running our own")
+                        continue
+                    yield sse_event("busy", {"error": "busy", "reason": busy.reason, "retry_after": busy.retry_after})
+                    return
+                if shared:
+                    print(f"🔗 Stream coalesced with in-flight query '{cache_key}'")
+                    final["coalesced"] = True
+                    total = timer.as_dict()["total"]
+                    query_latency.record({"coalesced": total, "total": total})
+                yield sse_event("final", final)
+                return
+            finally:
+                # Client went away (or the generator closed): detach from the flight
+                if not flight.done():
+                    flight.cancel()
+        yield sse_event("final", {"error": "query was cancelled", "answer": None})
+    
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.get("/metrics/latency")
+def latency_metrics():
+    """Rolling per-stage /query latency (ms): percentiles + histogram buckets."""
+    return {
+        "stages": query_latency.snapshot(),
+        "answer_cache": answer_cache.stats(),
+        "on_demand_cache": on_demand_cache.stats(),
+        "scheduler": query_scheduler.stats(),
+        "llm_router": llm_router.stats(),
+        "topic_briefings": topic_briefings.stats(),
+        "in_flight": inflight_queries.in_flight()
+    }
+
+@app.get("/health/embeddings")
+def embeddings_health():
+    """Embedding worker status (pings the process)."""
+    worker = get_embedding_worker()
+    if worker is None:
+        return {"available": False}
+    return {**worker.health(), "indexer": embedding_indexer.stats()}
+
 @app.get("/data")
 def get_data():
     with data_lock:
@@ -275,13 +579,13 @@ def get_data():
         
         from fastapi.responses import JSONResponse
         content = {
-            "newsapi": [i for i in items if i['source'] == 'newsapi'][-20:],
-            "gnews": [i for i in items if i['source'] == 'gnews'][-20:],
-            "hackernews": [i for i in items if i['source'] == 'hackernews'][-20:],
-            "reddit": [i for i in items if i['source'] == 'reddit'][-20:],
-            "firecrawl": [i for i in items if i['source'] == 'firecrawl'][-20:],
-            "opml": [i for i in items if i['source'] == 'opml'][-50:],
-            "newsdata": [i for i in items if 'newsdata' in i['source']][-20:],
+            "newsapi": to_dicts([i for i in items if i.source == 'newsapi'][-20:]),
+            "gnews": to_dicts([i for i in items if i.source == 'gnews'][-20:]),
+            "hackernews": to_dicts([i for i in items if i.source == 'hackernews'][-20:]),
+            "reddit": to_dicts([i for i in items if i.source == 'reddit'][-20:]),
+            "firecrawl": to_dicts([i for i in items if i.source == 'firecrawl'][-20:]),
+            "opml": to_dicts([i for i in items if i.source == 'opml'][-50:]),
+            "newsdata": to_dicts([i for i in items if 'newsdata' in i.source][-20:]),
             "stats": data_store["stats"]
         }
         return JSONResponse(content=content, headers={"Cache-Control": "no-store, no-cache, must-revalidate", "Pragma": "no-cache"})
@@ -339,48 +643,23 @@ def get_global_pulse():
 class TopicFilterRequest(BaseModel):
     topic: str
 
-@app.post("/filter_topic")
-def filter_topic_endpoint(req: TopicFilterRequest):
-    """
-    Smart topic filtering: Gets ALL live data + DB history and filters by topic using keywords.
-    Returns properly categorized news for the selected topic.
-    """
-    print(f"🎯 Smart Topic Filter: {req.topic}")
-    
-    topic = req.topic.lower()
-    
-    # Define topic keywords for smart matching
-    TOPIC_KEYWORDS = {
-        "technology": ["tech", "ai", "software", "google", "apple", "microsoft", "meta", "computer", "startup", "app", "digital", "internet", "cloud", "data", "cyber", "robot", "programming", "developer"],
-        "politics": ["trump", "biden", "election", "congress", "senate", "government", "president", "minister", "parliament", "political", "policy", "vote", "law", "legislation", "democrat", "republican", "modi", "putin"],
-        "business": ["market", "stock", "economy", "company", "ceo", "finance", "investment", "bank", "trade", "revenue", "profit", "merger", "acquisition", "startup", "ipo"],
-        "sports": ["football", "soccer", "basketball", "cricket", "tennis", "nba", "nfl", "fifa", "match", "game", "player", "team", "championship", "olympics", "win", "score"],
-        "entertainment": ["movie", "film", "music", "celebrity", "hollywood", "bollywood", "actor", "singer", "album", "concert", "netflix", "streaming", "show", "series"],
-        "health": ["health", "medical", "doctor", "hospital", "disease", "vaccine", "covid", "mental", "fitness", "medicine", "treatment", "patient", "wellness"],
-        "science": ["science", "research", "study", "nasa", "space", "discovery", "climate", "environment", "biology", "physics", "chemistry", "scientist"],
-        "world": ["international", "global", "war", "conflict", "china", "russia", "ukraine", "india", "europe", "asia", "africa", "foreign", "diplomacy"]
-    }
-    
-    keywords = TOPIC_KEYWORDS.get(topic, [topic])
-    
-    # 1. Get LIVE data from stream
+def live_topic_ids(keywords: list) -> set:
+    """Ids of live items matching any topic keyword (inverted index lookup)."""
     with data_lock:
-        live_items = list(data_store["items"])
+        return set(data_store["items"].match(keywords))
+
+def collect_topic_items(topic: str, keywords: list) -> list:
+    """Live + archived items matching a topic, deduplicated by URL, newest first."""
+    # 1. Get LIVE matches from the inverted index
+    with data_lock:
+        live_matches = data_store["items"].search(keywords)
     
     # 2. Get DB history
     db_items = search_history(topic, limit=30)
     print(f"📚 DB found {len(db_items)} historical items for '{topic}'")
     
-    # 3. Combine all sources
-    all_items = live_items + db_items
-    
-    # 4. Smart filter by topic keywords
-    matching_items = []
-    for item in all_items:
-        text = (str(item.get('text') or '') + ' ' + str(item.get('url') or '') + ' ' + str(item.get('category') or '')).lower()
-        # Check if ANY topic keyword matches
-        if any(kw in text for kw in keywords):
-            matching_items.append(item)
+    # 3/4. Combine with DB items matching ANY topic keyword
+    matching_items = live_matches + [i for i in db_items if term_hits(i.tokens, keywords)]
     
     print(f"🎯 Matched {len(matching_items)} items for topic '{topic}'")
     
@@ -393,28 +672,53 @@ def filter_topic_endpoint(req: TopicFilterRequest):
             seen_urls.add(url)
             unique_items.append(item)
     
-    # 6. Sort by freshness
-    from datetime import datetime, timezone
-    def parse_date(item):
-        try:
-            d = item.get('created_utc', '')
-            if isinstance(d, str):
-                if 'T' in d:
-                    # ISO format
-                    dt = datetime.fromisoformat(d.replace('Z', '+00:00'))
-                    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
-                else:
-                    # Try parsing rudimentary strings or fail
-                    return datetime.min.replace(tzinfo=timezone.utc)
-            elif isinstance(d, (int, float)):
-                return datetime.fromtimestamp(d, timezone.utc)
-            elif isinstance(d, datetime):
-                return d if d.tzinfo else d.replace(tzinfo=timezone.utc)
-        except:
-            pass
-        return datetime.min.replace(tzinfo=timezone.utc)
-    
-    unique_items.sort(key=parse_date, reverse=True)
+    # 6. Sort by freshness (epoch `ts` normalized at ingest)
+    unique_items.sort(key=lambda i: i.get('ts', 0.0), reverse=True)
+    return unique_items
+
+BRIEFING_CLIENT = "topic-briefings"  # Scheduler client id for background briefings
+
+async def answer_topic(items: list, question: str) -> dict:
+    """Briefing generation goes through the same admission control as /query."""
+    timer = StageTimer()
+    # Archived copies are left to the pipeline's own archive retrieval (ranked once)
+    items = [i for i in items if not i.get('source', '').endswith('_db')]
+    await query_scheduler.acquire(BRIEFING_CLIENT)
+    started = time.monotonic()
+    try:
+        return await pathway_rag_query(items, question, timer)
+    finally:
+        query_scheduler.release(BRIEFING_CLIENT, time.monotonic() - started)
+
+topic_briefings = TopicBriefings(live_topic_ids, collect_topic_items, answer_topic)
+
+@app.get("/briefing/{topic}")
+def briefing_endpoint(topic: str):
+    """
+    Materialized briefing for a dashboard topic, served from memory.
+    Until the first one is generated the response is {"status": "pending"}.
+    """
+    topic = topic.lower()
+    if topic not in TOPIC_KEYWORDS:
+        raise HTTPException(status_code=404, detail={"error": "unknown topic", "topics": list(TOPIC_KEYWORDS)})
+    briefing = topic_briefings.get(topic)
+    if briefing is None:
+        return {"topic": topic, "status": "pending"}
+    return {**briefing, "status": "ready"}
+
+@app.post("/filter_topic")
+def filter_topic_endpoint(req: TopicFilterRequest):
+    """
+    Smart topic filtering: Gets ALL live data + DB history and filters by topic using keywords.
+    Returns properly categorized news for the selected topic.
+    """
+    print(f"🎯 Smart Topic Filter: {req.topic}")
+    
+    topic = req.topic.lower()
+    
+    keywords = TOPIC_KEYWORDS.get(topic, query_terms(topic))
+    
+    unique_items = collect_topic_items(topic, keywords)
     
     # 7. Separate by source type for organized response
     opml_items = [i for i in unique_items if i.get('source') == 'opml'][:15]
@@ -427,11 +731,11 @@ def filter_topic_endpoint(req: TopicFilterRequest):
     
     return {
         "topic": topic,
-        "opml": opml_items,
-        "gnews": gnews_items,
-        "newsdata": newsdata_items,
-        "hackernews": hn_items,
-        "db_history": db_items_filtered,
+        "opml": to_dicts(opml_items),
+        "gnews": to_dicts(gnews_items),
+        "newsdata": to_dicts(newsdata_items),
+        "hackernews": to_dicts(hn_items),
+        "db_history": to_dicts(db_items_filtered),
         "total": len(unique_items)
     }
 
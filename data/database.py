@@ -1,16 +1,23 @@
+import json
+import os
 import sqlite3
 import time
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
+
+from ingest.article import Article
+from pipeline.live_index import query_terms, PREFIX_MIN_LEN
 
 # Database Path
 DB_DIR = Path(__file__).parent
-DB_PATH = DB_DIR / "news_archive.db"
+DB_PATH = Path(os.getenv("NEWS_DB_PATH", DB_DIR / "news_archive.db"))
+
+FTS_AVAILABLE = False
 
 def init_db():
     """Initialize the SQLite database and tables."""
-    if not DB_DIR.exists():
-        DB_DIR.mkdir(parents=True)
+    if not DB_PATH.parent.exists():
+        DB_PATH.parent.mkdir(parents=True)
 
     conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
@@ -33,6 +40,55 @@ def init_db():
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_source ON articles(source)")
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_created_at ON articles(created_at)")
     
+    # Full-text index (BM25 ranking) kept in sync with articles by triggers
+    global FTS_AVAILABLE
+    try:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'articles_fts'")
+        fts_exists = cursor.fetchone() is not None
+        cursor.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts
+        USING fts5(title, content, content='articles', content_rowid='id')
+        """)
+        cursor.executescript("""
+        CREATE TRIGGER IF NOT EXISTS articles_fts_insert AFTER INSERT ON articles BEGIN
+            INSERT INTO articles_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+        END;
+        CREATE TRIGGER IF NOT EXISTS articles_fts_delete AFTER DELETE ON articles BEGIN
+            INSERT INTO articles_fts(articles_fts, rowid, title, content)
+            VALUES ('delete', old.id, old.title, old.content);
+        END;
+        CREATE TRIGGER IF NOT EXISTS articles_fts_update AFTER UPDATE ON articles BEGIN
+            INSERT INTO articles_fts(articles_fts, rowid, title, content)
+            VALUES ('delete', old.id, old.title, old.content);
+            INSERT INTO articles_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+        END;
+        """)
+        if not fts_exists:
+            # Index rows archived before the FTS table existed
+            cursor.execute("INSERT INTO articles_fts(articles_fts) VALUES ('rebuild')")
+        FTS_AVAILABLE = True
+    except sqlite3.OperationalError as e:
+        print(f"⚠️ SQLite FTS5 unavailable, archive search falls back to LIKE: {e}")
+        FTS_AVAILABLE = False
+    
+    # Progress markers for resumable background jobs (e.g. embedding backfill)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS checkpoints (
+        name TEXT PRIMARY KEY,
+        value TEXT,
+        updated_at REAL
+    )
+    """)
+    
+    # Latest materialized briefing per topic (JSON payload incl. provenance)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS briefings (
+        topic TEXT PRIMARY KEY,
+        payload TEXT,
+        generated_at REAL
+    )
+    """)
+    
     conn.commit()
     conn.close()
     print(f"✅ SQLite Database initialized at {DB_PATH}")
@@ -79,11 +135,49 @@ def save_articles_batch(articles: List[Dict]) -> int:
             count += 1
     return count
 
-def search_history(query: str, limit: int = 50) -> List[Dict]:
+def _fts_match_expression(query: str) -> str:
+    """FTS5 MATCH string: any query term, long terms as prefixes (same rules as the live index)."""
+    terms = query_terms(query)
+    return " OR ".join(f'"{t}"*' if len(t) >= PREFIX_MIN_LEN else f'"{t}"' for t in terms)
+
+def search_history_ranked(query: str, limit: int = 50) -> List[Tuple[Article, float]]:
     """
-    Search historical articles using keyword-based search.
-    Splits query into words for broader matching.
+    BM25-ranked archive search via FTS5 (best first). Scores are positive,
+    higher is better; titles weigh double. Empty if FTS5 is unavailable.
     """
+    expression = _fts_match_expression(query)
+    if not FTS_AVAILABLE or not expression:
+        return []
+    
+    conn = sqlite3.connect(DB_PATH)
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            SELECT a.*, -bm25(articles_fts, 2.0, 1.0) AS score
+            FROM articles_fts JOIN articles a ON a.id = articles_fts.rowid
+            WHERE articles_fts MATCH ?
+            ORDER BY bm25(articles_fts, 2.0, 1.0)
+            LIMIT ?
+        """, (expression, limit))
+        rows = cursor.fetchall()
+    except sqlite3.OperationalError as e:
+        print(f"❌ FTS search error: {e}")
+        rows = []
+    finally:
+        conn.close()
+    return [(_row_to_article(row), row["score"]) for row in rows]
+
+def search_history(query: str, limit: int = 50) -> List[Article]:
+    """
+    Search historical articles, BM25-ranked through FTS5 when available.
+    Otherwise splits query into words for broader LIKE matching (newest first).
+    """
+    if FTS_AVAILABLE:
+        results = [article for article, _ in search_history_ranked(query, limit)]
+        print(f"📚 DB search found {len(results)} historical articles")
+        return results
+    
     conn = sqlite3.connect(DB_PATH)
     conn.row_factory = sqlite3.Row
     cursor = conn.cursor()
@@ -121,19 +215,70 @@ def search_history(query: str, limit: int = 50) -> List[Dict]:
     rows = cursor.fetchall()
     conn.close()
     
-    results = []
-    for row in rows:
-        results.append({
-            "source": row["source"] + "_db",  # Mark as DB source
-            "text": row["content"],
-            "url": row["url"],
-            "created_utc": row["published_date"],
-            "reliability": row["reliability"],
-            "is_historical": True
-        })
+    results = [_row_to_article(row) for row in rows]
     print(f"📚 DB search found {len(results)} historical articles")
     return results
 
+def _row_to_article(row) -> Article:
+    return Article(
+        text=row["content"] or "",
+        source=row["source"] + "_db",  # Mark as DB source
+        url=row["url"] or "",
+        created_utc=row["published_date"],
+        reliability=row["reliability"],
+        is_historical=True
+    )
+
+def get_articles_after(last_id: int, limit: int = 256) -> List[Tuple[int, Article]]:
+    """
+    Page through the archive in insertion order: (row id, Article) pairs
+    with id > last_id. Used by resumable background jobs.
+    """
+    conn = sqlite3.connect(DB_PATH)
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+    cursor.execute("SELECT * FROM articles WHERE id > ? ORDER BY id LIMIT ?", (last_id, limit))
+    rows = cursor.fetchall()
+    conn.close()
+    return [(row["id"], _row_to_article(row)) for row in rows]
+
+def get_checkpoint(name: str, default: Optional[str] = None) -> Optional[str]:
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    cursor.execute("SELECT value FROM checkpoints WHERE name = ?", (name,))
+    row = cursor.fetchone()
+    conn.close()
+    return row[0] if row else default
+
+def set_checkpoint(name: str, value: str):
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    cursor.execute("""
+        INSERT INTO checkpoints (name, value, updated_at) VALUES (?, ?, ?)
+        ON CONFLICT(name) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at
+    """, (name, value, time.time()))
+    conn.commit()
+    conn.close()
+
+def save_briefing(topic: str, payload: Dict):
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    cursor.execute("""
+        INSERT INTO briefings (topic, payload, generated_at) VALUES (?, ?, ?)
+        ON CONFLICT(topic) DO UPDATE SET payload = excluded.payload, generated_at = excluded.generated_at
+    """, (topic, json.dumps(payload), payload.get("generated_at", time.time())))
+    conn.commit()
+    conn.close()
+
+def load_briefings() -> Dict[str, Dict]:
+    """Latest stored briefing per topic."""
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    cursor.execute("SELECT topic, payload FROM briefings")
+    rows = cursor.fetchall()
+    conn.close()
+    return {topic: json.loads(payload) for topic, payload in rows}
+
 def get_stats() -> Dict:
     """Get database statistics."""
     conn = sqlite3.connect(DB_PATH)
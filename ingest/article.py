@@ -0,0 +1,201 @@
+# Compact article record shared by connectors, the live store and the API
+
+import re
+import sys
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+
+# Reliability is a closed vocabulary - anything else is stored as "Unknown"
+RELIABILITY_LEVELS = ("High", "Medium", "Low", "Unknown")
+_RELIABILITY = {level.lower(): sys.intern(level) for level in RELIABILITY_LEVELS}
+_UNKNOWN = _RELIABILITY["unknown"]
+
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+# Possessive / contraction suffixes ('s, 't, 'd, 'm) - otherwise "what's" yields
+# a lone "s" token that matches every possessive
+_APOSTROPHE_SUFFIX_RE = re.compile(r"['’][a-z]\b")
+
+
+def tokenize(text: str) -> list:
+    """Lowercase alphanumeric tokens, shared by ingest and query side."""
+    return _TOKEN_RE.findall(_APOSTROPHE_SUFFIX_RE.sub("", text.lower())) if text else []
+
+
+def _intern(value) -> Optional[str]:
+    """Intern short repeated strings (source names, categories)."""
+    if value is None or value == "":
+        return None
+    return sys.intern(str(value))
+
+
+def parse_timestamp(value) -> float:
+    """
+    Normalize any connector timestamp to epoch seconds (UTC).
+    Handles floats/ints, epoch strings, epoch milliseconds, ISO-8601
+    (with or without 'Z') and RFC822 dates. Returns 0.0 if unparseable.
+    """
+    if value is None or value == "":
+        return 0.0
+
+    if isinstance(value, (int, float)):
+        ts = float(value)
+    elif isinstance(value, datetime):
+        dt = value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+        ts = dt.timestamp()
+    else:
+        text = str(value).strip()
+        try:
+            ts = float(text)
+        except ValueError:
+            ts = _parse_date_string(text)
+
+    if ts > 1e11:  # Epoch milliseconds
+        ts /= 1000.0
+    return ts if ts > 0 else 0.0
+
+
+def _parse_date_string(text: str) -> float:
+    try:
+        dt = datetime.fromisoformat(text.replace('Z', '+00:00'))
+    except ValueError:
+        try:
+            dt = parsedate_to_datetime(text)  # RFC822 (RSS pubDate)
+        except (TypeError, ValueError, IndexError):
+            return 0.0
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+def format_timestamp(ts: float) -> str:
+    """Canonical ISO-8601 UTC string for an epoch timestamp."""
+    return time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(ts))
+
+
+def normalize_reliability(value) -> str:
+    if not value:
+        return _UNKNOWN
+    return _RELIABILITY.get(str(value).strip().lower(), _UNKNOWN)
+
+
+class Article:
+    """
+    Slotted article record used in place of raw connector dicts.
+    Source, reliability and category are interned so the live deque, the
+    DB batch buffers and the request snapshots all share one copy of each
+    repeated value. Supports the read side of the dict protocol
+    (get / [] / in / keys) so existing consumers keep working.
+
+    `ts` is the publication time as epoch seconds, parsed once here;
+    `created_utc` keeps the connector's original value. Downstream code
+    should read `ts` (0.0 means unknown). `tokens` is the set of search
+    tokens over text, URL and category, also computed once here.
+    """
+
+    __slots__ = (
+        "text", "source", "url", "created_utc", "ts", "reliability",
+        "category", "feed_title", "score", "image_url", "is_historical",
+        "tokens",
+    )
+
+    def __init__(self, text: str, source: str, url: str = "",
+                 created_utc=None, reliability: str = "Unknown",
+                 category: str = None, feed_title: str = None,
+                 score: int = None, image_url: str = None,
+                 is_historical: bool = False):
+        self.text = text
+        self.source = sys.intern(source)
+        self.url = url
+        self.created_utc = created_utc
+        self.ts = parse_timestamp(created_utc)
+        self.reliability = normalize_reliability(reliability)
+        self.category = _intern(category)
+        self.feed_title = _intern(feed_title)
+        self.score = score
+        self.image_url = image_url
+        self.is_historical = is_historical
+        self.tokens = frozenset(
+            sys.intern(t) for t in tokenize(f"{text} {url} {category or ''}")
+        )
+
+    @classmethod
+    def from_raw(cls, raw) -> Optional["Article"]:
+        """
+        Validated constructor for connector output.
+        Accepts a raw connector dict (or an Article, returned as-is).
+        Returns None for items without any text or URL.
+        """
+        if raw is None or isinstance(raw, cls):
+            return raw
+
+        text = raw.get("text") or ""
+        url = raw.get("url") or ""
+        if not isinstance(text, str):
+            text = str(text)
+        if not isinstance(url, str):
+            url = str(url)
+        if not text and not url:
+            return None
+
+        score = raw.get("score")
+        try:
+            score = int(score) if score is not None else None
+        except (TypeError, ValueError):
+            score = None
+
+        return cls(
+            text=text,
+            source=str(raw.get("source") or "unknown"),
+            url=url,
+            created_utc=raw.get("created_utc"),
+            reliability=raw.get("reliability"),
+            category=raw.get("category"),
+            feed_title=raw.get("feed_title"),
+            score=score,
+            image_url=raw.get("image_url"),
+            is_historical=bool(raw.get("is_historical", False)),
+        )
+
+    # --- dict-style read access ---
+    def get(self, key: str, default=None):
+        if key not in self.__slots__:
+            return default
+        value = getattr(self, key)
+        return default if value is None else value
+
+    def __getitem__(self, key: str):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        value = getattr(self, key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.__slots__ and getattr(self, key) is not None
+
+    def keys(self):
+        return [k for k in self.__slots__ if k != "tokens" and getattr(self, k) is not None]
+
+    def to_dict(self) -> Dict:
+        """
+        JSON-ready dict (only the fields that are set).
+        `created_utc` is emitted in canonical ISO form so clients parse one format.
+        """
+        d = {k: getattr(self, k) for k in self.keys()}
+        if self.ts:
+            d["created_utc"] = format_timestamp(self.ts)
+        if not self.is_historical:
+            d.pop("is_historical", None)
+        return d
+
+    def __repr__(self) -> str:
+        return f"Article(source={self.source!r}, url={self.url!r})"
+
+
+def to_dicts(items) -> list:
+    """Serialize a list of Articles (or plain dicts) for a JSON response."""
+    return [i.to_dict() if isinstance(i, Article) else i for i in items]
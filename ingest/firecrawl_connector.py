@@ -3,6 +3,7 @@ import requests
 import yaml
 # import pathway as pw
 from pathlib import Path
+from ingest.article import Article
 
 # Load config
 CONFIG_PATH = Path(__file__).parent.parent / "config.yaml"
@@ -88,13 +89,15 @@ class FirecrawlConnector:
 
 
 # --- ON-DEMAND TARGETED SCRAPING ---
-def scrape_targeted(query: str) -> list:
+def scrape_targeted(query: str, timeout: float = 45) -> list:
     """
     Perform an active web scrape for a specific user query.
+    Returns None when the scrape failed (no key, HTTP error, timeout) -
+    [] means Firecrawl answered and found nothing.
     """
     if not API_KEY:
         print("⚠️ No Firecrawl Key for targeted scrape.")
-        return []
+        return None
         
     print(f"🔥 Firecrawl Targeted Scrape: '{query}'")
     url = "https://api.firecrawl.dev/v0/search"
@@ -108,7 +111,7 @@ def scrape_targeted(query: str) -> list:
     }
     
     try:
-        resp = requests.post(url, headers=headers, json=payload, timeout=45)
+        resp = requests.post(url, headers=headers, json=payload, timeout=timeout)
         items = []
         
         if resp.status_code == 200:
@@ -120,19 +123,19 @@ def scrape_targeted(query: str) -> list:
                 snippet = markdown[:800].replace("\n", " ").strip() # Longer snippet for targeted
                 title = item.get("title", "Web Result")
                 
-                items.append({
-                    "source": "firecrawl_targeted",
-                    "text": f"{title}: {snippet}",
-                    "url": item.get("url"),
-                    "created_utc": str(time.time()),
-                    "reliability": "Medium"
-                })
+                items.append(Article(
+                    text=f"{title}: {snippet}",
+                    source="firecrawl_targeted",
+                    url=item.get("url") or "",
+                    created_utc=str(time.time()),
+                    reliability="Medium"
+                ))
             print(f"✅ Found {len(items)} web results.")
             return items
         else:
             print(f"❌ Firecrawl Scrape Error: {resp.text}")
-            return []
+            return None
             
     except Exception as e:
         print(f"❌ Firecrawl Scrape Exception: {e}")
-        return []
+        return None
@@ -3,6 +3,7 @@ import requests
 import yaml
 # import pathway as pw
 from pathlib import Path
+from ingest.article import Article
 
 # Load config
 CONFIG_PATH = Path(__file__).parent.parent / "config.yaml"
@@ -83,14 +84,16 @@ class GNewsConnector:
 
 
 # --- ON-DEMAND HISTORICAL SEARCH ---
-def search_historical(query: str, days: int = 1000) -> list:
+def search_historical(query: str, days: int = 1000, timeout: float = 30) -> list:
     """
     Perform an on-demand historical search for specific keywords.
     Uses the /search endpoint instead of /top-headlines.
+    Returns None when the search could not be done (no key, HTTP error,
+    timeout) - [] means GNews answered and found nothing.
     """
     if not API_KEY or API_KEY == "your_gnews_api_key":
         print("⚠️ No GNews Key for historical search.")
-        return []
+        return None
         
     print(f"🌍 GNews Historical Search: '{query}' (Last {days} days)")
     base_url = "https://gnews.io/api/v4/search"
@@ -107,25 +110,25 @@ def search_historical(query: str, days: int = 1000) -> list:
     }
     
     try:
-        resp = requests.get(base_url, params=params, timeout=30)
+        resp = requests.get(base_url, params=params, timeout=timeout)
         items = []
         if resp.status_code == 200:
             data = resp.json()
             articles = data.get("articles", [])
             
             for article in articles:
-                items.append({
-                    "source": "gnews_historical",
-                    "text": f"{article.get('title', '')}. {article.get('description', '')}",
-                    "url": article.get("url"),
-                    "created_utc": article.get("publishedAt", ""),
-                    "reliability": "High"
-                })
+                items.append(Article(
+                    text=f"{article.get('title', '')}. {article.get('description', '')}",
+                    source="gnews_historical",
+                    url=article.get("url") or "",
+                    created_utc=article.get("publishedAt", ""),
+                    reliability="High"
+                ))
             print(f"✅ Found {len(items)} historical articles.")
             return items
         else:
             print(f"❌ GNews Search Error: {resp.text}")
-            return []
+            return None
     except Exception as e:
         print(f"❌ GNews Search Exception: {e}")
-        return []
+        return None
@@ -0,0 +1,192 @@
+# On-demand web fallback: fan out to targeted search sources in parallel
+# under one overall deadline, instead of calling them one after the other.
+# Results are cached per (source, normalized query) with a TTL - including
+# empty results, so repeat questions don't re-spend paid API quota. Only a
+# source that actually answered is cached: failures and timeouts are retried.
+# The deadline only bounds how long the caller waits: each source keeps its
+# own (longer) HTTP timeout and finishes in the background, so a slow source
+# like Firecrawl still warms the cache for the next identical question.
+
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from ingest.gnews_connector import search_historical
+from ingest.firecrawl_connector import scrape_targeted
+from pipeline.answer_cache import normalize_query
+
+# Overall budget for the whole fallback (all sources together)
+WEB_FALLBACK_DEADLINE = float(os.getenv("WEB_FALLBACK_DEADLINE", "12"))
+
+# How long source results are reused; empty results expire sooner
+ON_DEMAND_CACHE_TTL = float(os.getenv("ON_DEMAND_CACHE_TTL", "1800"))
+ON_DEMAND_NEGATIVE_TTL = float(os.getenv("ON_DEMAND_NEGATIVE_TTL", "300"))
+ON_DEMAND_CACHE_SIZE = int(os.getenv("ON_DEMAND_CACHE_SIZE", "512"))
+
+# Each source is called as fn(query, timeout) and returns a list of Articles,
+# or None when the call failed (no key, HTTP error, timeout)
+ON_DEMAND_SOURCES = {
+    "gnews_historical": lambda query, timeout: search_historical(query, days=1000, timeout=timeout),
+    "firecrawl_targeted": lambda query, timeout: scrape_targeted(query, timeout=timeout),
+}
+
+# Per-source HTTP timeout for the background fetch (independent of the deadline)
+ON_DEMAND_SOURCE_TIMEOUTS = {
+    "gnews_historical": float(os.getenv("GNEWS_SEARCH_TIMEOUT", "30")),
+    "firecrawl_targeted": float(os.getenv("FIRECRAWL_SEARCH_TIMEOUT", "45")),
+}
+
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="on_demand")
+
+# (source, query_key) -> fetch still running, so a repeat question attaches to it
+_in_flight = {}
+_in_flight_lock = threading.Lock()
+
+
+class OnDemandCache:
+    """
+    Thread-safe LRU of {(source, query_key): (expires, items)}.
+    Empty results are negative entries with the shorter ON_DEMAND_NEGATIVE_TTL.
+    Failures are never cached - callers only put() what a source returned.
+    """
+
+    def __init__(self, ttl: float = ON_DEMAND_CACHE_TTL, negative_ttl: float = ON_DEMAND_NEGATIVE_TTL,
+                 max_entries: int = ON_DEMAND_CACHE_SIZE):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+
+    def get(self, source: str, key: str) -> Optional[list]:
+        """Cached items (possibly []) or None on a miss / expired entry."""
+        with self._lock:
+            entry = self._entries.get((source, key))
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[(source, key)]
+                self.misses += 1
+                return None
+            self._entries.move_to_end((source, key))
+            if entry[1]:
+                self.hits += 1
+            else:
+                self.negative_hits += 1
+            return list(entry[1])
+
+    def put(self, source: str, key: str, items: list):
+        if not key:
+            return
+        ttl = self.ttl if items else self.negative_ttl
+        with self._lock:
+            self._entries[(source, key)] = (time.monotonic() + ttl, list(items))
+            self._entries.move_to_end((source, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits,
+                    "negative_hits": self.negative_hits, "misses": self.misses}
+
+
+on_demand_cache = OnDemandCache()
+
+
+def _fetch_and_cache(name: str, fetch, query: str, key: str) -> list:
+    """
+    Run one source in a worker thread and cache what it returns.
+    Uses the source's own timeout (ON_DEMAND_SOURCE_TIMEOUTS), not the
+    caller's deadline, and runs to completion after the caller has stopped
+    waiting - so a Firecrawl scrape that takes 30s+ still lands in the cache
+    for the next identical question. Only a real failure (None) is not cached.
+    """
+    try:
+        results = fetch(query, ON_DEMAND_SOURCE_TIMEOUTS.get(name, WEB_FALLBACK_DEADLINE))
+    except Exception as e:
+        print(f"❌ On-demand source {name} failed for '{key}': {e}")
+        return []
+    if results is None:
+        print(f"⚠️ On-demand source {name} failed for '{key}' (not cached)")
+        return []
+    on_demand_cache.put(name, key, results)
+    return results
+
+
+def _start_fetch(name: str, fetch, query: str, key: str):
+    """Submit a background fetch, or return the one already running for (name, key)."""
+    with _in_flight_lock:
+        running = _in_flight.get((name, key))
+        if running is not None:
+            return running
+        future = _executor.submit(_fetch_and_cache, name, fetch, query, key)
+        _in_flight[(name, key)] = future
+
+    def forget(_):
+        with _in_flight_lock:
+            if _in_flight.get((name, key)) is future:
+                del _in_flight[(name, key)]
+
+    future.add_done_callback(forget)
+    return future
+
+
+async def fetch_on_demand(query: str, deadline: float = WEB_FALLBACK_DEADLINE, enough: int = None) -> list:
+    """
+    Query all on-demand sources concurrently and return whatever arrived
+    before `deadline` seconds. If `enough` is set, return as soon as that
+    many items have been collected. Sources still pending are not cancelled:
+    they finish in the worker pool and cache their results for next time.
+    The blocking connector calls run in the worker pool; the caller only awaits.
+    Sources with a fresh cached result (even an empty one) are not called,
+    and a source already fetching the same question is joined, not re-called.
+    """
+    start = time.monotonic()
+    key = normalize_query(query)
+    
+    items = []
+    misses = []
+    for name, fetch in ON_DEMAND_SOURCES.items():
+        cached = on_demand_cache.get(name, key)
+        if cached is None:
+            misses.append((name, fetch))
+            continue
+        print(f"♻️ {name}: {len(cached)} cached items for '{key}'")
+        items.extend(cached)
+    if enough and len(items) >= enough:
+        return items
+    
+    futures = {asyncio.wrap_future(_start_fetch(name, fetch, query, key)): name for name, fetch in misses}
+    pending = set(futures)
+    while pending:
+        remaining = deadline - (time.monotonic() - start)
+        if remaining <= 0:
+            break
+        done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+        for future in done:
+            try:
+                results = future.result()
+            except Exception as e:
+                print(f"❌ On-demand source {futures[future]} failed: {e}")
+                continue
+            print(f"🌐 {futures[future]}: {len(results)} items in {time.monotonic() - start:.2f}s")
+            items.extend(results)
+        if enough and len(items) >= enough:
+            break
+    
+    for future in pending:
+        print(f"⏱️ On-demand source {futures[future]} missed the {deadline:.0f}s deadline (still fetching for the cache)")
+    
+    return items
+
+
+def persist_in_background(items: list, save_fn):
+    """Hand DB persistence of on-demand results to the worker pool."""
+    _executor.submit(save_fn, items)
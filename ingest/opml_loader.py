@@ -8,11 +8,14 @@ import time
 import random
 import re
 
+from ingest.article import Article
+
 
 class OPMLIngestor:
     """
     Pathway Connector that ingests RSS feeds from OPML files.
     Designed for high-volume ingestion from repositories like plenaryapp/awesome-rss-feeds.
+    Yields Article records directly since this is the highest-volume stream.
     """
     
     def __init__(self, opml_urls, poll_frequency=300):
@@ -146,15 +149,15 @@ class OPMLIngestor:
                                 print(f"📰 OPML: Yielded {items_yielded} items so far...")
                             
                             # Yield normalized schema for Pathway
-                            yield {
-                                "text": f"{entry.get('title', 'Untitled')} - {entry.get('summary', '')[:300]}",
-                                "source": "opml",  # Consistent source name for filtering
-                                "category": category,
-                                "url": entry.link,
-                                "reliability": "High",  # RSS is generally reliable
-                                "created_utc": pub_date,
-                                "feed_title": feed.feed.get('title', 'Unknown')
-                            }
+                            yield Article(
+                                text=f"{entry.get('title', 'Untitled')} - {entry.get('summary', '')[:300]}",
+                                source="opml",  # Consistent source name for filtering
+                                category=category,
+                                url=entry.link,
+                                reliability="High",  # RSS is generally reliable
+                                created_utc=pub_date,
+                                feed_title=feed.feed.get('title', 'Unknown')
+                            )
                 except Exception as e:
                     # print(f"⚠️ Error processing feed {url}: {e}") # Optional: uncomment for debugging
                     continue  # Skip broken feeds
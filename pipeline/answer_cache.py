@@ -0,0 +1,73 @@
+# Freshness-aware answer cache for /query
+#
+# Entries are keyed by the normalized question and remember which live items
+# matched it when the answer was generated. A lookup only hits if the same
+# set of live items still matches - as soon as a new matching item arrives
+# (or an old one is evicted) the entry is stale and the query is recomputed.
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from pipeline.live_index import query_terms
+
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "600"))
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "256"))
+
+
+def normalize_query(query: str) -> str:
+    """
+    Canonical cache key for a question. Case, punctuation, word order and
+    question words are ignored, so "What's happening with AI regulation?"
+    and "ai regulation" share an entry.
+    """
+    return " ".join(sorted(query_terms(query)))
+
+
+class AnswerCache:
+    """Thread-safe LRU of {key: (created, context_ids, result)} with a TTL."""
+
+    def __init__(self, ttl: float = ANSWER_CACHE_TTL, max_entries: int = ANSWER_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str, context_ids: frozenset) -> Optional[dict]:
+        """Cached result if it is younger than the TTL and was built from `context_ids`."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            created, cached_ids, result = entry
+            if time.time() - created > self.ttl or cached_ids != context_ids:
+                # New matching items arrived (or TTL expired) - drop it
+                del self._entries[key]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            hit = dict(result)
+            hit["cached"] = True
+            hit["cache_age"] = round(time.time() - created, 1)
+            return hit
+
+    def put(self, key: str, context_ids: frozenset, result: dict):
+        if not key or result.get("error") or not result.get("answer"):
+            return  # Never cache failures
+        with self._lock:
+            self._entries[key] = (time.time(), context_ids, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
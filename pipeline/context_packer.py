@@ -0,0 +1,94 @@
+# Token-budgeted context packing for RAG prompts
+#
+# Instead of sending the first N context items whatever their length, each
+# item is costed in (estimated) tokens and the prompt is filled greedily by
+# relevance per token until CONTEXT_TOKEN_BUDGET is spent. Long items are
+# trimmed at sentence boundaries first, so one 800-char scrape can no longer
+# crowd out several short, on-topic headlines.
+
+import os
+import re
+from typing import Callable, List, Tuple
+
+from pipeline.live_index import term_hits, item_tokens
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "3000"))
+# Per-item ceiling - longer texts are trimmed to roughly this many tokens
+ITEM_TOKEN_CAP = int(os.getenv("CONTEXT_ITEM_TOKEN_CAP", "250"))
+# Don't bother squeezing an item into less than this
+MIN_ITEM_TOKENS = 24
+CHARS_PER_TOKEN = 4
+
+_SENTENCE_END_RE = re.compile(r"[.!?](?=\s|$)")
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 chars per token for English text)."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN if text else 0
+
+
+def trim_to_tokens(text: str, max_tokens: int) -> str:
+    """
+    Cut `text` to about `max_tokens`, preferring the last sentence boundary
+    that fits; falls back to a word boundary with an ellipsis.
+    """
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+
+    head = text[:max_chars]
+    cut = 0
+    for m in _SENTENCE_END_RE.finditer(head):
+        cut = m.end()
+    if cut >= max_chars // 2:
+        return head[:cut]
+
+    space = head.rfind(" ")
+    if space > 0:
+        head = head[:space]
+    return head.rstrip(" ,;:-") + "…"
+
+
+def pack_context(items: list, terms: List[str], render: Callable[[object, str], str],
+                 budget: int = CONTEXT_TOKEN_BUDGET) -> Tuple[List[str], list, int]:
+    """
+    Choose and render context blocks within `budget` tokens.
+
+    `items` arrive in priority order (OPML/keyword matches first); an item's
+    score is its query-term hits plus a bonus that decays with that rank.
+    Items are taken greedily by score per token, then emitted in their
+    original priority order. `render(item, text)` formats one block.
+    Returns (blocks, packed_items, tokens_used).
+    """
+    n = len(items)
+    candidates = []
+    for rank, item in enumerate(items):
+        text = trim_to_tokens(item.get('text', ''), ITEM_TOKEN_CAP)
+        block = render(item, text)
+        cost = estimate_tokens(block)
+        score = 1 + term_hits(item_tokens(item), terms) + (n - rank) / n
+        candidates.append((score / max(cost, 1), rank, item, text, cost))
+
+    candidates.sort(key=lambda c: (-c[0], c[1]))
+
+    chosen = []
+    used = 0
+    for _, rank, item, text, cost in candidates:
+        remaining = budget - used
+        if remaining < MIN_ITEM_TOKENS:
+            break
+        if cost > remaining:
+            # Squeeze the text into what's left (the header costs tokens too)
+            overhead = cost - estimate_tokens(text)
+            if remaining - overhead < MIN_ITEM_TOKENS:
+                continue
+            text = trim_to_tokens(text, remaining - overhead)
+            cost = estimate_tokens(render(item, text))
+            if cost > remaining:
+                continue
+        chosen.append((rank, item, text))
+        used += cost
+
+    chosen.sort(key=lambda c: c[0])
+    blocks = [render(item, text) for _, item, text in chosen]
+    return blocks, [item for _, item, _ in chosen], used
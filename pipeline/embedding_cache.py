@@ -0,0 +1,137 @@
+# Persistent content-hash embedding cache
+#
+# Every text sent to the embedding worker is keyed by BLAKE2b(model name +
+# normalized text), a hash that is stable across processes and restarts
+# (unlike Python's salted hash()). Keys and float32 vectors are appended to
+# two flat files and read back through a memory map, so re-embedding the
+# same story from another source, after a restart, or the same question
+# asked twice is a dictionary lookup.
+
+import hashlib
+import json
+import os
+import threading
+import unicodedata
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+
+EMBED_CACHE_DIR = Path(os.getenv("EMBED_CACHE_DIR", Path(__file__).parent.parent / "data" / "embedding_cache"))
+EMBED_CACHE_MAX_ROWS = int(os.getenv("EMBED_CACHE_MAX_ROWS", "2000000"))
+KEY_BYTES = 16
+
+
+def normalize_text(text: str) -> str:
+    """Whitespace- and Unicode-normalized text, so trivially different copies share a key."""
+    return " ".join(unicodedata.normalize("NFC", text or "").split())
+
+
+def content_key(text: str, model: str) -> bytes:
+    """Stable 16-byte BLAKE2b key for (model, normalized text)."""
+    h = hashlib.blake2b(digest_size=KEY_BYTES)
+    h.update(model.encode("utf-8"))
+    h.update(b"\0")
+    h.update(normalize_text(text).encode("utf-8"))
+    return h.digest()
+
+
+class EmbeddingCache:
+    """
+    Append-only key -> vector store for one model. Thread-safe.
+    Once EMBED_CACHE_MAX_ROWS is reached new vectors are simply not cached.
+    """
+
+    def __init__(self, model: str, cache_dir: Path = EMBED_CACHE_DIR):
+        self.model = model
+        self.cache_dir = Path(cache_dir) / model.replace("/", "_")
+        self._lock = threading.Lock()
+        self._rows = {}  # key -> row
+        self.dim: Optional[int] = None
+        self._count = 0
+        self._vectors: Optional[np.memmap] = None  # Mapped rows; remapped as the file grows
+        self.hits = 0
+        self.misses = 0
+        self._load()
+
+    @property
+    def _keys_path(self) -> Path:
+        return self.cache_dir / "keys.bin"
+
+    @property
+    def _vectors_path(self) -> Path:
+        return self.cache_dir / "vectors.f32"
+
+    @property
+    def _header_path(self) -> Path:
+        return self.cache_dir / "cache.json"
+
+    def _load(self):
+        if not self._header_path.exists():
+            return
+        self.dim = json.loads(self._header_path.read_text())["dim"]
+        keys = self._keys_path.read_bytes() if self._keys_path.exists() else b""
+        vector_rows = self._vectors_path.stat().st_size // (self.dim * 4) if self._vectors_path.exists() else 0
+        # A crash can leave one file a row ahead of the other
+        self._count = min(len(keys) // KEY_BYTES, vector_rows)
+        for row in range(self._count):
+            self._rows[keys[row * KEY_BYTES:(row + 1) * KEY_BYTES]] = row
+        self._truncate_files()
+        self._remap()
+        print(f"✅ Embedding cache loaded: {self._count} vectors ({self.model})")
+
+    def _truncate_files(self):
+        for path, width in ((self._keys_path, KEY_BYTES), (self._vectors_path, self.dim * 4)):
+            if path.exists() and path.stat().st_size != self._count * width:
+                with open(path, "r+b") as f:
+                    f.truncate(self._count * width)
+
+    def _remap(self):
+        if self._count:
+            self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode="r",
+                                      shape=(self._count, self.dim))
+
+    def get_many(self, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """Cached vector per text (None for misses)."""
+        keys = [content_key(t, self.model) for t in texts]
+        with self._lock:
+            rows = [self._rows.get(k) for k in keys]
+            vectors = self._vectors
+        found = [None if row is None else np.array(vectors[row]) for row in rows]
+        hits = sum(1 for v in found if v is not None)
+        with self._lock:
+            self.hits += hits
+            self.misses += len(found) - hits
+        return found
+
+    def put_many(self, texts: List[str], vectors: np.ndarray):
+        if not len(texts):
+            return
+        with self._lock:
+            if self.dim is None:
+                self.dim = int(vectors.shape[1])
+                self.cache_dir.mkdir(parents=True, exist_ok=True)
+                self._header_path.write_text(json.dumps({"model": self.model, "dim": self.dim}))
+
+            new_keys, new_rows = [], []
+            for text, vector in zip(texts, vectors):
+                key = content_key(text, self.model)
+                if key in self._rows or self._count + len(new_keys) >= EMBED_CACHE_MAX_ROWS:
+                    continue
+                self._rows[key] = self._count + len(new_keys)
+                new_keys.append(key)
+                new_rows.append(vector)
+            if not new_keys:
+                return
+
+            # Vectors first: a key without its vector is dropped on the next load
+            with open(self._vectors_path, "ab") as f:
+                f.write(np.asarray(new_rows, dtype=np.float32).tobytes())
+            with open(self._keys_path, "ab") as f:
+                f.write(b"".join(new_keys))
+            self._count += len(new_keys)
+            self._remap()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": self._count, "hits": self.hits, "misses": self.misses}
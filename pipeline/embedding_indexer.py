@@ -0,0 +1,148 @@
+# Ingest-time embedding for the vector store
+#
+# Connectors hand every new Article to the indexer, which embeds them in a
+# background thread in batches (flushed by size or age), so /query only ever
+# embeds the question itself. A second thread backfills the SQLite archive
+# page by page, recording its position in the `checkpoints` table so it
+# resumes where it left off, then keeps polling for rows added later (e.g.
+# persisted web fallback results).
+
+import os
+import queue
+import threading
+import time
+
+from data.database import get_articles_after, get_checkpoint, set_checkpoint
+from pipeline.embedding_worker import EmbeddingUnavailable
+from pipeline.vector_store import get_vector_store
+
+EMBED_INDEX_BATCH = int(os.getenv("EMBED_INDEX_BATCH", "64"))
+EMBED_INDEX_FLUSH_SECONDS = float(os.getenv("EMBED_INDEX_FLUSH_SECONDS", "2"))
+EMBED_INDEX_QUEUE = int(os.getenv("EMBED_INDEX_QUEUE", "5000"))
+BACKFILL_PAGE = int(os.getenv("EMBED_BACKFILL_PAGE", "256"))
+BACKFILL_PAUSE = 0.5  # Between pages, so live batches get the worker first
+BACKFILL_POLL = 300  # Once caught up, look for new archive rows this often
+READY_POLL = 5
+# Error replies from a worker that stays up (e.g. a batch the model rejects)
+EMBED_INDEX_RETRIES = 3
+
+BACKFILL_CHECKPOINT = "embedding_backfill_last_id"
+
+
+class EmbeddingIndexer:
+    def __init__(self):
+        self._queue = queue.Queue(maxsize=EMBED_INDEX_QUEUE)
+        self._started = False
+        self.indexed = 0
+        self.dropped = 0
+        self.backfill_last_id = 0
+        self.backfill_indexed = 0
+        self.backfill_caught_up = False
+
+    def start(self):
+        if self._started or get_vector_store() is None:
+            return
+        self._started = True
+        threading.Thread(target=self._index_loop, daemon=True, name="embedding-indexer").start()
+        threading.Thread(target=self._backfill_loop, daemon=True, name="embedding-backfill").start()
+
+    def submit(self, item):
+        """Queue a freshly ingested item for embedding (never blocks the connector)."""
+        if not self._started:
+            return
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            # The archive backfill picks it up from SQLite later
+            self.dropped += 1
+
+    def _wait_until_ready(self, vs):
+        while not vs.ready():
+            time.sleep(READY_POLL)
+
+    def _embed(self, vs, items: list) -> int:
+        """
+        Embed a batch, retrying if the worker goes away mid-batch. Raises
+        EmbeddingUnavailable if a ready worker keeps answering with an error,
+        so callers never count the batch as stored.
+        """
+        errors = 0
+        while True:
+            self._wait_until_ready(vs)
+            try:
+                return vs.add_items(items)
+            except EmbeddingUnavailable as e:
+                if not vs.ready():
+                    continue  # Restarting - wait for the new worker
+                errors += 1
+                if errors >= EMBED_INDEX_RETRIES:
+                    raise
+                print(f"⚠️ Embedding batch failed ({e}), retrying")
+                time.sleep(READY_POLL)
+
+    def _index_loop(self):
+        vs = get_vector_store()
+        batch = []
+        first_at = 0.0
+        while True:
+            timeout = None
+            if batch:
+                timeout = max(0.0, first_at + EMBED_INDEX_FLUSH_SECONDS - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+                if not batch:
+                    first_at = time.monotonic()
+                batch.append(item)
+            except queue.Empty:
+                pass
+
+            if batch and (len(batch) >= EMBED_INDEX_BATCH
+                          or time.monotonic() - first_at >= EMBED_INDEX_FLUSH_SECONDS):
+                try:
+                    self.indexed += self._embed(vs, batch)
+                except Exception as e:
+                    # The archive backfill picks these up from SQLite later
+                    print(f"❌ Embedding indexer error: {e}")
+                    self.dropped += len(batch)
+                batch = []
+
+    def _backfill_loop(self):
+        vs = get_vector_store()
+        # Only trust the checkpoint if the index persisted (an empty or rebuilt index starts over)
+        last_id = int(get_checkpoint(BACKFILL_CHECKPOINT, "0")) if vs.persistent and vs.count() else 0
+        self.backfill_last_id = last_id
+        print(f"🗄️ Embedding backfill starting after archive row {last_id}")
+
+        while True:
+            try:
+                rows = get_articles_after(last_id, BACKFILL_PAGE)
+                if not rows:
+                    if not self.backfill_caught_up:
+                        print(f"✅ Embedding backfill caught up ({self.backfill_indexed} archive items)")
+                    self.backfill_caught_up = True
+                    time.sleep(BACKFILL_POLL)
+                    continue
+
+                self.backfill_caught_up = False
+                # Raises if the page was not stored, so the checkpoint stays put and the page is retried
+                self.backfill_indexed += self._embed(vs, [article for _, article in rows])
+                last_id = rows[-1][0]
+                set_checkpoint(BACKFILL_CHECKPOINT, str(last_id))
+                self.backfill_last_id = last_id
+            except Exception as e:
+                print(f"❌ Embedding backfill error: {e}")
+                time.sleep(READY_POLL)
+            time.sleep(BACKFILL_PAUSE)
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize(),
+            "indexed": self.indexed,
+            "dropped": self.dropped,
+            "backfill_last_id": self.backfill_last_id,
+            "backfill_indexed": self.backfill_indexed,
+            "backfill_caught_up": self.backfill_caught_up,
+        }
+
+
+embedding_indexer = EmbeddingIndexer()
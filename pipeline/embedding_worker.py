@@ -0,0 +1,282 @@
+# Out-of-process sentence embeddings
+#
+# Loading SentenceTransformer (torch) inside the multi-threaded API process
+# deadlocks on a mutex, which is why vector search had been switched off.
+# The model now lives in a dedicated 'spawn' worker process: the API sends
+# batches of texts over a pipe and gets float32 arrays back. The worker is
+# health-checked periodically and restarted (with backoff) if it dies,
+# fails to load, or stops answering. The pipe is taken one batch at a time
+# and bulk (indexing) batches step aside while a query encode is waiting,
+# so a question never queues behind a whole backfill page.
+
+import multiprocessing as mp
+import os
+import threading
+import time
+from importlib.util import find_spec
+from typing import List, Optional
+
+import numpy as np
+
+from pipeline.embedding_cache import EmbeddingCache
+
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+EMBED_TIMEOUT = float(os.getenv("EMBED_TIMEOUT", "30"))  # Per batch
+EMBED_STARTUP_TIMEOUT = float(os.getenv("EMBED_STARTUP_TIMEOUT", "180"))  # Model load
+EMBED_HEALTH_INTERVAL = float(os.getenv("EMBED_HEALTH_INTERVAL", "30"))
+# Longest a query encode waits for the batch already on the pipe
+EMBED_QUERY_WAIT = float(os.getenv("EMBED_QUERY_WAIT", "2"))
+MAX_RESTART_BACKOFF = 300
+
+# Checked without importing - torch must never load in the API process
+EMBEDDINGS_AVAILABLE = find_spec("sentence_transformers") is not None
+if not EMBEDDINGS_AVAILABLE:
+    print("⚠️ sentence-transformers not installed. Vector search disabled.")
+
+
+class EmbeddingUnavailable(RuntimeError):
+    """The worker is starting, restarting or failed; callers fall back to keyword search."""
+
+
+def _worker_main(conn, model_name: str):
+    """Entry point of the child process: load the model, then serve requests."""
+    try:
+        from sentence_transformers import SentenceTransformer
+        model = SentenceTransformer(model_name)
+    except Exception as e:
+        conn.send(("error", f"model load failed: {e!r}"))
+        return
+    conn.send(("ready", model.get_sentence_embedding_dimension()))
+
+    while True:
+        try:
+            op, payload = conn.recv()
+        except (EOFError, OSError):
+            return  # Parent went away
+        if op == "stop":
+            return
+        if op == "ping":
+            conn.send(("pong", None))
+            continue
+        try:
+            vectors = model.encode(payload, batch_size=EMBED_BATCH_SIZE,
+                                   normalize_embeddings=True, convert_to_numpy=True)
+            conn.send(("ok", vectors.astype(np.float32)))
+        except Exception as e:
+            conn.send(("error", repr(e)))
+
+
+class EmbeddingWorker:
+    """
+    Handle on the embedding process. Thread-safe: one request is on the
+    pipe at a time. Never blocks on model loading - until the worker has
+    reported ready, encode() raises EmbeddingUnavailable immediately.
+    """
+
+    def __init__(self, model_name: str = EMBEDDING_MODEL):
+        self.model_name = model_name
+        self._ctx = mp.get_context("spawn")
+        self._lock = threading.Lock()
+        self._priority = threading.Condition()  # Guards _priority_waiting
+        self._priority_waiting = 0
+        self._proc = None
+        self._conn = None
+        self._spawned_at = 0.0
+        self._retry_at = 0.0
+        self._backoff = 1.0
+        self._monitor = None
+        self.dim: Optional[int] = None
+        self.ready = False
+        self.restarts = 0
+        self.last_error: Optional[str] = None
+        self.cache = EmbeddingCache(model_name)
+
+    def start(self):
+        """Spawn the worker (model loads in the background) and the health monitor."""
+        with self._lock:
+            if self._proc is None:
+                self._spawn()
+        if self._monitor is None:
+            self._monitor = threading.Thread(target=self._monitor_loop, daemon=True,
+                                             name="embedding-monitor")
+            self._monitor.start()
+
+    # --- process lifecycle (caller holds _lock) ---
+    def _spawn(self):
+        parent, child = self._ctx.Pipe()
+        proc = self._ctx.Process(target=_worker_main, args=(child, self.model_name),
+                                 daemon=True, name="embedding-worker")
+        proc.start()
+        child.close()
+        self._proc, self._conn = proc, parent
+        self._spawned_at = time.monotonic()
+        self.ready = False
+        print(f"🧬 Embedding worker starting (pid {proc.pid}, model {self.model_name})")
+
+    def _kill(self):
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except OSError:
+                pass
+        if self._proc is not None:
+            if self._proc.is_alive():
+                self._proc.terminate()
+            self._proc.join(timeout=5)
+        self._proc, self._conn = None, None
+        self.ready = False
+
+    def _restart(self, reason: str):
+        """Kill the worker; a new one is spawned once the backoff has passed."""
+        print(f"♻️ Embedding worker restart scheduled in {self._backoff:.0f}s: {reason}")
+        self.last_error = reason
+        self.restarts += 1
+        self._kill()
+        self._retry_at = time.monotonic() + self._backoff
+        self._backoff = min(self._backoff * 2, MAX_RESTART_BACKOFF)
+
+    def _check_ready(self) -> bool:
+        if self.ready:
+            return True
+        if self._proc is None:
+            if self._monitor is not None and time.monotonic() >= self._retry_at:
+                self._spawn()
+            return False
+        try:
+            if self._conn.poll(0):
+                status, payload = self._conn.recv()
+                if status == "ready":
+                    self.ready, self.dim, self._backoff = True, payload, 1.0
+                    print(f"✅ Embedding worker ready (dim {payload})")
+                else:
+                    self._restart(payload)
+            elif not self._proc.is_alive():
+                self._restart("worker exited during startup")
+            elif time.monotonic() - self._spawned_at > EMBED_STARTUP_TIMEOUT:
+                self._restart("model load timed out")
+        except (EOFError, OSError) as e:
+            self._restart(f"worker pipe closed: {e!r}")
+        return self.ready
+
+    def _call(self, op: str, payload, timeout: float):
+        self._conn.send((op, payload))
+        if not self._conn.poll(timeout):
+            raise TimeoutError(f"no reply to '{op}' within {timeout:.0f}s")
+        return self._conn.recv()
+
+    # --- public API ---
+    def is_ready(self) -> bool:
+        """True once the model is loaded (also advances startup/restart state)."""
+        with self._lock:
+            return self._check_ready()
+
+    def encode(self, texts: List[str], timeout: float = EMBED_TIMEOUT, priority: bool = False) -> np.ndarray:
+        """
+        L2-normalized float32 embeddings, one row per text. Texts seen
+        before (by content hash) come from the on-disk cache; only misses
+        go to the worker, so a fully cached call works even while it restarts.
+        priority=True (query encodes) goes ahead of waiting bulk batches and
+        gives up after EMBED_QUERY_WAIT if the pipe stays busy.
+        """
+        vectors = self.cache.get_many(texts)
+        missing = [i for i, v in enumerate(vectors) if v is None]
+        if missing:
+            fresh = self._encode_remote([texts[i] for i in missing], timeout, priority)
+            self.cache.put_many([texts[i] for i in missing], fresh)
+            for i, vector in zip(missing, fresh):
+                vectors[i] = vector
+        if not vectors:
+            return np.zeros((0, self.dim or self.cache.dim or 0), dtype=np.float32)
+        return np.stack(vectors)
+
+    def _acquire_pipe(self, priority: bool):
+        """Take the pipe for one batch: bulk callers yield to waiting query encodes."""
+        if not priority:
+            with self._priority:
+                self._priority.wait_for(lambda: not self._priority_waiting)
+            self._lock.acquire()
+            return
+        with self._priority:
+            self._priority_waiting += 1
+        try:
+            if not self._lock.acquire(timeout=EMBED_QUERY_WAIT):
+                raise EmbeddingUnavailable(f"embedding worker busy for {EMBED_QUERY_WAIT:.0f}s")
+        finally:
+            with self._priority:
+                self._priority_waiting -= 1
+                self._priority.notify_all()
+
+    def _encode_remote(self, texts: List[str], timeout: float, priority: bool = False) -> np.ndarray:
+        chunks = []
+        for start in range(0, len(texts), EMBED_BATCH_SIZE):
+            batch = list(texts[start:start + EMBED_BATCH_SIZE])
+            # One batch per turn on the pipe, so a query encode waits for one batch at most
+            self._acquire_pipe(priority)
+            try:
+                if not self._check_ready():
+                    raise EmbeddingUnavailable(self.last_error or "embedding worker is starting")
+                try:
+                    status, payload = self._call("encode", batch, timeout)
+                except (TimeoutError, EOFError, OSError) as e:
+                    # A late reply would desync the pipe - replace the worker
+                    self._restart(f"encode failed: {e!r}")
+                    raise EmbeddingUnavailable(str(e)) from e
+            finally:
+                self._lock.release()
+            if status != "ok":
+                raise EmbeddingUnavailable(payload)
+            chunks.append(payload)
+        return np.concatenate(chunks)
+
+    def health(self, timeout: float = 5.0) -> dict:
+        """Ping the worker; a live but unresponsive worker is restarted."""
+        with self._lock:
+            responsive = False
+            if self._check_ready():
+                try:
+                    responsive = self._call("ping", None, timeout)[0] == "pong"
+                except (TimeoutError, EOFError, OSError) as e:
+                    self._restart(f"health check failed: {e!r}")
+            return {
+                "available": EMBEDDINGS_AVAILABLE,
+                "model": self.model_name,
+                "pid": self._proc.pid if self._proc else None,
+                "alive": bool(self._proc and self._proc.is_alive()),
+                "ready": self.ready,
+                "responsive": responsive,
+                "dim": self.dim,
+                "restarts": self.restarts,
+                "last_error": self.last_error,
+                "cache": self.cache.stats(),
+            }
+
+    def _monitor_loop(self):
+        while True:
+            time.sleep(EMBED_HEALTH_INTERVAL)
+            self.health()
+
+    def stop(self):
+        with self._lock:
+            if self._conn is not None and self._proc is not None and self._proc.is_alive():
+                try:
+                    self._conn.send(("stop", None))
+                except OSError:
+                    pass
+            self._kill()
+
+
+_worker: Optional[EmbeddingWorker] = None
+_worker_lock = threading.Lock()
+
+
+def get_embedding_worker() -> Optional[EmbeddingWorker]:
+    """Shared worker (started on first use), or None if embeddings aren't installed."""
+    global _worker
+    if not EMBEDDINGS_AVAILABLE:
+        return None
+    with _worker_lock:
+        if _worker is None:
+            _worker = EmbeddingWorker()
+            _worker.start()
+        return _worker
@@ -1,11 +1,29 @@
 # Enhanced RAG Pipeline with Hybrid Vector + Live Search
 
 import google.generativeai as genai
+import httpx
 import yaml
 from pathlib import Path
+import asyncio
+import contextlib
 import os
-import requests
+import json
 import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Optional
+
+from pipeline.live_index import query_terms
+from pipeline.context_packer import pack_context, trim_to_tokens
+from pipeline.hybrid_retrieval import bm25_rank, fuse, item_key, relevant_items, RETRIEVAL_TOP_K
+from pipeline.story_clusters import cluster_stories, corroboration
+from pipeline.timing import StageTimer
+from pipeline.llm_router import llm_router
+from pipeline.llm_providers import (
+    FunctionProvider, ReplayProvider, register_provider, set_providers, configured_providers, LLM_PROVIDER
+)
+# Embeddings are computed out of process (pipeline/embedding_worker.py), so
+# sentence_transformers no longer loads - and deadlocks - inside the API server
+from pipeline.vector_store import get_vector_store
 
 # Load config
 CONFIG_PATH = Path(__file__).parent.parent / "config.yaml"
@@ -13,244 +31,133 @@ try:
     with open(CONFIG_PATH) as f:
         config = yaml.safe_load(f)
         GEMINI_API_KEY = config.get("gemini", {}).get("api_key")
-        GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 except Exception as e:
     print(f"⚠️ Error loading config for Gemini: {e}")
     GEMINI_API_KEY = None
+GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 
-# Vector Store DISABLED to avoid mutex lock issues with sentence_transformers
-_vector_store = None
+# Explicit LLM timeouts (seconds)
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+LLM_READ_TIMEOUT = float(os.getenv("LLM_READ_TIMEOUT", "30"))
 
-def get_vector_store():
-    # DISABLED: Vector store causes mutex lock with sentence_transformers
-    # Using keyword matching instead for fast, reliable search
-    return None
+GEMINI_MODEL = "gemini-1.5-flash"
+GROQ_MODEL = "llama-3.3-70b-versatile"
+GROQ_URL = "https://api.groq.com/openai/v1/chat/completions"
 
+# RAG depth: "full" sends every retrieved story (within the token budget);
+# "geometric" starts small and grows the context only when the model says it lacks information
+RAG_MODE = os.getenv("RAG_MODE", "full")
+GEOMETRIC_START_STORIES = int(os.getenv("GEOMETRIC_START_STORIES", "4"))
+GEOMETRIC_FACTOR = int(os.getenv("GEOMETRIC_FACTOR", "2"))
+GEOMETRIC_MAX_ROUNDS = int(os.getenv("GEOMETRIC_MAX_ROUNDS", "3"))
+# Lowercased fragment of the system prompt's "no data" reply
+NO_DATA_MARKER = "do not contain data"
+# Streaming geometric rounds hold back this much output, enough to spot the "no data" reply
+GEOMETRIC_PROBE_CHARS = 240
 
-def filter_fresh_items(items: list, max_age_seconds: int = 300) -> list:
-    """
-    Filter items to only include those created within max_age_seconds.
-    Default: 5 minutes (300 seconds)
-    """
-    if not items:
-        return []
-    
-    current_time = time.time()
-    fresh = []
-    
-    for item in items:
-        created = item.get('created_utc', 0)
-        
-        # Handle ISO date strings (e.g., "2026-01-10T07:57:09Z")
-        if isinstance(created, str):
-            try:
-                from datetime import datetime
-                dt = datetime.fromisoformat(created.replace('Z', '+00:00'))
-                created = dt.timestamp()
-            except:
-                created = 0
-        else:
-            try:
-                created = float(created)
-            except (ValueError, TypeError):
-                created = 0
-        
-        # Exempt on-demand/historical sources from freshness check
-        source = item.get('source', '')
-        category = item.get('category', '')
-        if 'historical' in source or 'targeted' in source or 'newsapi_search' in source or category == 'search_result':
-            fresh.append(item)
-            continue
-            
-        age = current_time - created
-        if age < max_age_seconds or created == 0:  # Include items without timestamp
-            fresh.append(item)
-    
-    return fresh
+# Map-reduce: past this many relevant stories, summarize them all in shards
+# (in parallel) and answer from the shard summaries. 0 disables.
+MAP_REDUCE_MIN_STORIES = int(os.getenv("MAP_REDUCE_MIN_STORIES", "40"))
+MAP_REDUCE_MAX_ITEMS = int(os.getenv("MAP_REDUCE_MAX_ITEMS", "400"))  # Relevant items considered at most
+MAP_CHUNK_STORIES = int(os.getenv("MAP_CHUNK_STORIES", "20"))
+MAP_CONCURRENCY = int(os.getenv("MAP_CONCURRENCY", "4"))  # Shard summaries in flight per query
+MAP_SUMMARY_TOKEN_CAP = 300
+# Archive / vector candidates per query (deeper than the prompt, for map-reduce)
+RETRIEVAL_CANDIDATES = 100
+# Vector search (question embedding + scan) gets this long before fusion goes on without it
+VECTOR_SEARCH_TIMEOUT = float(os.getenv("VECTOR_SEARCH_TIMEOUT", "2.5"))
 
+# Archive / vector retrieval run concurrently inside retrieve_context
+_retrieval_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="retrieval")
 
-def filter_relevant_items(items: list, query: str) -> list:
-    """
-    Quick keyword-based relevance filter.
-    """
-    if not query:
-        return items
-    
-    query_words = set(query.lower().split())
-    scored_items = []
-    
-    for item in items:
-        text = item.get('text', '').lower()
-        # Count matching words
-        score = sum(1 for word in query_words if word in text)
-        if score > 0:
-            scored_items.append((score, item))
-    
-    # Sort by relevance score
-    scored_items.sort(key=lambda x: x[0], reverse=True)
-    return [item for score, item in scored_items]
+# Long-lived provider clients (created on first use, reused by every query)
+_gemini_model = None
+_groq_client = None
+
+
+def get_gemini_model():
+    """Configure the Gemini SDK once and reuse a single model handle."""
+    global _gemini_model
+    if _gemini_model is None:
+        genai.configure(api_key=GEMINI_API_KEY)
+        _gemini_model = genai.GenerativeModel(GEMINI_MODEL)
+    return _gemini_model
+
+
+def get_groq_client() -> httpx.AsyncClient:
+    """Pooled async HTTP client for Groq with keep-alive connections."""
+    global _groq_client
+    if _groq_client is None or _groq_client.is_closed:
+        _groq_client = httpx.AsyncClient(
+            headers={
+                "Authorization": f"Bearer {GROQ_API_KEY}",
+                "Content-Type": "application/json"
+            },
+            timeout=httpx.Timeout(LLM_READ_TIMEOUT, connect=LLM_CONNECT_TIMEOUT),
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20)
+        )
+    return _groq_client
+
+
+async def close_llm_clients():
+    """Close pooled provider connections (app shutdown)."""
+    global _groq_client
+    if _groq_client is not None:
+        await _groq_client.aclose()
+        _groq_client = None
 
 
-def query_gemini(system_prompt: str, user_prompt: str) -> dict:
+def _groq_payload(system_prompt: str, user_prompt: str, stream: bool = False) -> dict:
+    return {
+        "model": GROQ_MODEL,
+        "messages": [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ],
+        "max_tokens": 1000,
+        "stream": stream
+    }
+
+
+async def query_gemini(system_prompt: str, user_prompt: str) -> dict:
     if not GEMINI_API_KEY or GEMINI_API_KEY == "your_gemini_api_key":
         print("⚠️ Gemini API Key missing or default.")
         return {"error": "Gemini API key not configured", "answer": None}
         
     try:
-        genai.configure(api_key=GEMINI_API_KEY)
-        model = genai.GenerativeModel('gemini-1.5-flash')
-        
         full_prompt = f"{system_prompt}\n\n{user_prompt}"
-        response = model.generate_content(full_prompt)
+        response = await get_gemini_model().generate_content_async(
+            full_prompt, request_options={"timeout": LLM_READ_TIMEOUT}
+        )
         
         return {
             "answer": response.text,
-            "llm": "gemini-1.5-flash"
+            "llm": GEMINI_MODEL
         }
     except Exception as e:
         print(f"❌ Gemini Error: {e}")
         return {"error": str(e), "answer": None}
 
 
-def query_groq_fallback(system_prompt: str, user_prompt: str) -> dict:
+async def query_groq_fallback(system_prompt: str, user_prompt: str) -> dict:
     if not GROQ_API_KEY:
         return {"error": "Groq API key not configured", "answer": None}
         
     try:
-        headers = {
-            "Authorization": f"Bearer {GROQ_API_KEY}",
-            "Content-Type": "application/json"
-        }
-        data = {
-            "model": "llama-3.3-70b-versatile",
-            "messages": [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            "max_tokens": 1000
-        }
-        resp = requests.post("https://api.groq.com/openai/v1/chat/completions", headers=headers, json=data)
+        resp = await get_groq_client().post(GROQ_URL, json=_groq_payload(system_prompt, user_prompt))
         if resp.status_code == 200:
             return {
                 "answer": resp.json()["choices"][0]["message"]["content"],
                 "llm": "groq-llama-3.3"
             }
+        print(f"❌ Groq Error {resp.status_code}: {resp.text[:100]}")
     except Exception as e:
         print(f"❌ Groq Error: {e}")
     return {"error": "All LLMs failed", "answer": None}
 
 
-def pathway_rag_query(context_items: list, question: str) -> dict:
-    """
-    Enhanced RAG query with:
-    1. Historical database search (ALL stored content)
-    2. Live stream items
-    3. Vector semantic search
-    4. Hybrid context building
-    """
-    
-    # === STEP 1: Search Historical Database (ALL content from all sources) ===
-    from data.database import search_history
-    db_results = search_history(question, limit=20)
-    print(f"📚 Database search: {len(db_results)} historical items")
-    
-    # === STEP 2: Get fresh live items (no time filter - use ALL context) ===
-    fresh_items = context_items  # Use ALL live items, no freshness filter
-    print(f"📡 Live stream: {len(fresh_items)} items")
-    
-    # === STEP 3: Keyword relevance filter on combined content ===
-    all_items = list(fresh_items) + db_results
-    keyword_matches = filter_relevant_items(all_items, question)
-    print(f"🔍 Keyword matches: {len(keyword_matches)} items")
-    
-    # === STEP 4: Vector semantic search (SEARCHES ALL CONTENT) ===
-    vector_matches = []
-    vs = get_vector_store()
-    if vs:
-        # Add ALL live items to vector store for IMMEDIATE indexing
-        added = vs.add_items(list(fresh_items))
-        if added > 0:
-            print(f"📥 Added {added} items to vector store (TOTAL: {vs.count()})")
-        # Search ALL indexed content - NO TIME LIMIT
-        vector_matches = vs.search(question, n_results=20)
-        print(f"🧠 Vector matches: {len(vector_matches)} items from {vs.count()} total indexed")
-    
-    # === STEP 5: Hybrid context (combine all sources) - OPML FIRST ===
-    seen_urls = set()
-    hybrid_context = []
-    
-    # PRIORITY 0: OPML items from keyword matches (HIGHEST PRIORITY)
-    opml_keyword = [i for i in keyword_matches if i.get('source') == 'opml']
-    for item in opml_keyword[:10]:
-        url = item.get('url', '')
-        if url not in seen_urls:
-            seen_urls.add(url)
-            hybrid_context.append(item)
-    
-    # PRIORITY 1: Other keyword matches
-    other_keyword = [i for i in keyword_matches if i.get('source') != 'opml']
-    for item in other_keyword[:10]:
-        url = item.get('url', '')
-        if url not in seen_urls:
-            seen_urls.add(url)
-            hybrid_context.append(item)
-    
-    # Priority 2: Vector matches (semantically similar)
-    for item in vector_matches[:10]:
-        url = item.get('url', '')
-        if url not in seen_urls:
-            seen_urls.add(url)
-            hybrid_context.append(item)
-    
-    # Priority 3: Database historical results
-    for item in db_results[:10]:
-        url = item.get('url', '')
-        if url not in seen_urls:
-            seen_urls.add(url)
-            hybrid_context.append(item)
-    
-    # Priority 4: Fill remaining with live items (OPML first)
-    opml_live = [i for i in fresh_items if i.get('source') == 'opml']
-    for item in opml_live[:5]:
-        url = item.get('url', '')
-        if url not in seen_urls:
-            seen_urls.add(url)
-            hybrid_context.append(item)
-    
-    for item in list(fresh_items)[:5]:
-        url = item.get('url', '')
-        if url not in seen_urls:
-            seen_urls.add(url)
-            hybrid_context.append(item)
-    
-    if not hybrid_context:
-        # Fallback to most recent items if no matches
-        hybrid_context = context_items[-20:]
-    
-    opml_in_context = sum(1 for i in hybrid_context if i.get('source') == 'opml')
-    print(f"📦 Final hybrid context: {len(hybrid_context)} items (OPML: {opml_in_context} prioritized)")
-    
-    # === STEP 5: Build context string ===
-    context_parts = []
-    for item in hybrid_context[:25]:
-        rel = item.get("reliability", "Unknown")
-        created = item.get("created_utc", 0)
-        try:
-            age_mins = int((time.time() - float(created)) / 60)
-            age_str = f"{age_mins} min ago" if age_mins < 60 else f"{age_mins // 60}h ago"
-        except:
-            age_str = "Unknown time"
-        
-        context_parts.append(
-            f"[Source: {item['source']} | Age: {age_str} | Reliability: {rel}]\n"
-            f"{item['text']}\n"
-            f"URL: {item.get('url', 'N/A')}"
-        )
-    
-    context_str = "\n\n---\n\n".join(context_parts)
-    
-    # === STEP 6: System Prompt (Chief Intelligence Officer) ===
-    system_prompt = """
+# === System Prompt (Chief Intelligence Officer) ===
+SYSTEM_PROMPT = """
 ### SYSTEM ROLE
 You are the **Live Social Analyst (LSA) Intelligence Engine**.
 Your objective is to synthesize a high-velocity stream of fragmented data points (RSS feeds, social posts, news alerts) into a coherent, verifiable intelligence briefing.
@@ -260,11 +167,13 @@ You will be provided with a set of retrieved data points. Each point contains:
 - [Source]: The origin (e.g., BBC, TechCrunch, Reddit).
 - [Age]: When the event occurred relative to now.
 - [Reliability]: A pre-calculated score (High/Low/Unknown).
+- [Corroborated by]: Other outlets reporting the same story (with their reliability), when there are any.
 
 ### OPERATIONAL RULES
 1.  **Strict De-Duplication**: 
     - Multiple sources often report the same event. Do NOT list them as separate events.
     - Instead, synthesize them: "Multiple outlets (BBC, Reuters) report that..."
+    - Stories carried by several outlets arrive already merged: one data point whose [Corroborated by] field lists the other outlets. Treat a story as High Reliability if any corroborating outlet is.
     
 2.  **Reliability-First Reporting**:
     - If a claim comes ONLY from a "Low Reliability" or "Unknown" source (e.g., Reddit, Twitter), you MUST preface it with: "⚠️ *Unverified User Reports indicate...*"
@@ -298,24 +207,470 @@ RULES:
 - Prioritize RECENT news items (check the "Age" field).
 - De-duplicate similar stories into one finding.
     """
+
+
+def format_context_item(item, text: str, corroborated_by: list = None) -> str:
+    """One context block as it appears in the prompt."""
+    rel = item.get("reliability", "Unknown")
+    created = item.get("ts", 0.0)
+    if created:
+        age_mins = int((time.time() - created) / 60)
+        age_str = f"{age_mins} min ago" if age_mins < 60 else f"{age_mins // 60}h ago"
+    else:
+        age_str = "Unknown time"
+    
+    corroborated = f" | Corroborated by: {', '.join(corroborated_by)}" if corroborated_by else ""
+    return (
+        f"[Source: {item['source']} | Age: {age_str} | Reliability: {rel}{corroborated}]\n"
+        f"{text}\n"
+        f"URL: {item.get('url', 'N/A')}"
+    )
+
+
+def retrieve_context(context_items: list, question: str, archive: list = None) -> dict:
+    """
+    Retrieval half of the RAG query, as one hybrid stage:
+    1. BM25 over the live candidates (context_items)
+    2. BM25 over the archive (SQLite FTS5) and vector search, in parallel
+    3. Reciprocal rank fusion with source / freshness / reliability priors
+    4. Story clustering - one representative per story, with its corroborating outlets
+    `context_items` are live / on-demand candidates only - archive rows come
+    from step 2, so each is ranked once. Pass `archive` when the caller
+    already ran that search (search_history(question, RETRIEVAL_CANDIDATES)).
+    Returns the ranked story representatives plus retrieval metadata.
+    """
+    terms = query_terms(question)
+    
+    # === STEP 1-2: Archive + vector retrieval run in parallel with live BM25 ===
+    from data.database import search_history
+    vs = get_vector_store()
+    archive_future = None if archive is not None else _retrieval_pool.submit(search_history, question, RETRIEVAL_CANDIDATES)
+    # Items are embedded at ingest (pipeline/embedding_indexer.py) - only the question is embedded here
+    vector_future = _retrieval_pool.submit(vs.search, question, RETRIEVAL_CANDIDATES) if vs else None
+    
+    live_ranked = [item for item, _ in bm25_rank(context_items, terms)]
+    print(f"📡 Live BM25: {len(live_ranked)} of {len(context_items)} candidates match")
+    db_results = archive_future.result() if archive_future else archive
+    print(f"📚 Archive BM25: {len(db_results)} historical items")
+    vector_matches = []
+    if vector_future:
+        try:
+            vector_matches = vector_future.result(timeout=VECTOR_SEARCH_TIMEOUT)
+        except FutureTimeout:
+            print(f"⏱️ Vector search exceeded {VECTOR_SEARCH_TIMEOUT}s, fusing without it")
+    if vs:
+        print(f"🧠 Vector matches: {len(vector_matches)} items from {vs.count()} total indexed")
+    
+    # === STEP 3: Reciprocal rank fusion ===
+    fused = fuse({"live_bm25": live_ranked, "archive_bm25": db_results, "vector": vector_matches},
+                 top_k=max(MAP_REDUCE_MAX_ITEMS, RETRIEVAL_TOP_K))
+    hybrid_context = [item for item, _ in fused[:RETRIEVAL_TOP_K]]
+    # Candidate depth is not relevance: only items passing the cut count toward map-reduce
+    relevant = relevant_items(fused, terms, vector_matches)
+    
+    if not hybrid_context:
+        # Fallback to most recent items if no matches
+        hybrid_context = context_items[-20:]
+    
+    opml_in_context = sum(1 for i in hybrid_context if i.get('source') == 'opml')
+    print(f"📦 Fused hybrid context: {len(hybrid_context)} items (OPML: {opml_in_context})")
+    
+    # === STEP 4: Collapse copies of the same story ===
+    stories = cluster_stories(hybrid_context)
+    print(f"🧩 {len(hybrid_context)} items -> {len(stories)} stories")
+    
+    # Large result sets (breaking events): cluster everything relevant for map-reduce
+    all_stories = None
+    if MAP_REDUCE_MIN_STORIES and len(relevant) > max(MAP_REDUCE_MIN_STORIES, RETRIEVAL_TOP_K):
+        all_stories = cluster_stories(relevant)
+        print(f"🗺️ {len(relevant)} relevant items -> {len(all_stories)} stories")
+        if len(all_stories) <= MAP_REDUCE_MIN_STORIES:
+            all_stories = None
+    
+    return {
+        "terms": terms,
+        "representatives": [cluster[0] for cluster in stories],
+        "all_representatives": [cluster[0] for cluster in all_stories] if all_stories else None,
+        "corroborated_by": {item_key(cluster[0]): corroboration(cluster)
+                            for cluster in (all_stories or []) + stories},
+        "sources_analyzed": {
+            "total": len(context_items),
+            "fresh": len(context_items),
+            "keyword_matches": len(live_ranked) + len(db_results),
+            "vector_matches": len(vector_matches),
+            "candidates": len(fused),
+            "relevant": len(relevant),
+            "hybrid_context": len(hybrid_context),
+            "stories": len(stories),
+            "news": sum(1 for i in hybrid_context if i['source'] in ['newsdata', 'gnews']),
+            "social": sum(1 for i in hybrid_context if i['source'] in ['reddit', 'hackernews'])
+        }
+    }
+
+
+def render_prompt(retrieval: dict, question: str, max_stories: int = None) -> dict:
+    """
+    Pack the top `max_stories` story representatives (all if None) into the
+    token budget and build the prompts.
+    """
+    corroborated_by = retrieval["corroborated_by"]
+    representatives = retrieval["representatives"][:max_stories]
+    
+    def render(item, text):
+        return format_context_item(item, text, corroborated_by.get(item_key(item)))
+    
+    # === STEP 5: Pack context blocks into the token budget ===
+    context_parts, packed, context_tokens = pack_context(representatives, retrieval["terms"], render)
+    print(f"✂️ Packed {len(packed)}/{len(representatives)} stories into ~{context_tokens} tokens")
+    
+    context_str = "\n\n---\n\n".join(context_parts)
     
     user_prompt = f"Question: {question}\n\nLIVE CONTEXT (FRESHNESS-FILTERED):\n{context_str}"
     
-    # === STEP 7: Query LLM ===
-    result = query_gemini(system_prompt, user_prompt)
-    if result.get("error"):
-        print("🔄 Gemini failed, trying Groq fallback...")
-        result = query_groq_fallback(system_prompt, user_prompt)
+    return {
+        "system_prompt": SYSTEM_PROMPT,
+        "user_prompt": user_prompt,
+        "context": packed,
+        "sources_analyzed": {
+            **retrieval["sources_analyzed"],
+            "packed": len(packed),
+            "context_tokens": context_tokens,
+        }
+    }
+
+
+def build_rag_prompt(context_items: list, question: str, archive: list = None) -> dict:
+    """Hybrid retrieval + prompt over every retrieved story (full-depth mode)."""
+    return render_prompt(retrieve_context(context_items, question, archive), question)
+
+
+def lacks_information(answer: str) -> bool:
+    """True if the model used the system prompt's 'no data on this topic' reply."""
+    parsed = parse_answer_json(answer)
+    summary = str(parsed.get("summary", "")) if parsed else (answer or "")
+    return NO_DATA_MARKER in summary.lower()
+
+
+def geometric_depths(retrieval: dict) -> list:
+    """Stories per geometric round: GEOMETRIC_START_STORIES, times GEOMETRIC_FACTOR, up to all of them."""
+    available = len(retrieval["representatives"])
+    depths = [GEOMETRIC_START_STORIES]
+    while depths[-1] < available and len(depths) < GEOMETRIC_MAX_ROUNDS:
+        depths.append(depths[-1] * GEOMETRIC_FACTOR)
+    return depths
+
+
+def geometric_round(prompt: dict, stories: int, retrieval: dict) -> dict:
+    return {"stories": min(stories, len(retrieval["representatives"])),
+            "context_tokens": prompt["sources_analyzed"]["context_tokens"]}
+
+
+async def geometric_rag_query(retrieval: dict, question: str, timer: StageTimer) -> tuple:
+    """
+    Adaptive-depth answer (the geometric RAG of Pathway's answer_with_geometric_rag):
+    ask with the top GEOMETRIC_START_STORIES stories, and only if the model
+    reports missing information ask again with GEOMETRIC_FACTOR times as many,
+    up to GEOMETRIC_MAX_ROUNDS. Returns (result, prompt, rounds).
+    """
+    rounds = []
+    depths = geometric_depths(retrieval)
+    for stories in depths:
+        prompt = render_prompt(retrieval, question, stories)
+        with timer.stage("llm"):
+            result = await llm_router.query(configured_providers(), prompt["system_prompt"], prompt["user_prompt"])
+        rounds.append(geometric_round(prompt, stories, retrieval))
         
-    # === STEP 8: Add metadata ===
-    result["sources_analyzed"] = {
-        "total": len(context_items),
-        "fresh": len(fresh_items),
-        "keyword_matches": len(keyword_matches),
-        "vector_matches": len(vector_matches),
-        "hybrid_context": len(hybrid_context),
-        "news": sum(1 for i in hybrid_context if i['source'] in ['newsdata', 'gnews']),
-        "social": sum(1 for i in hybrid_context if i['source'] in ['reddit', 'hackernews'])
+        if result.get("error") or not lacks_information(result.get("answer")):
+            break
+        if len(rounds) < len(depths):
+            print(f"🔁 Not enough information with {rounds[-1]['stories']} stories, retrying deeper")
+    return result, prompt, rounds
+
+
+MAP_PROMPT = """
+You are condensing one shard of a large set of retrieved news data points for an intelligence briefing.
+Extract every fact relevant to the question as a bullet list, at most 8 bullets, most important first.
+Merge data points that report the same event. End each bullet with its sources in the form
+(Source | Reliability | URL). If nothing in the shard is relevant, reply with the single word NONE.
+"""
+
+
+async def summarize_shard(retrieval: dict, question: str, shard: list, semaphore: asyncio.Semaphore):
+    """Map step: bullet summary of one shard of stories (None if it failed or had nothing relevant)."""
+    corroborated_by = retrieval["corroborated_by"]
+    
+    def render(item, text):
+        return format_context_item(item, text, corroborated_by.get(item_key(item)))
+    
+    blocks, packed, _ = pack_context(shard, retrieval["terms"], render)
+    user_prompt = f"Question: {question}\n\nDATA POINTS:\n" + "\n\n---\n\n".join(blocks)
+    async with semaphore:
+        result = await llm_router.query(configured_providers(), MAP_PROMPT, user_prompt)
+    answer = (result.get("answer") or "").strip()
+    if result.get("error") or not answer or answer.upper().startswith("NONE"):
+        return None
+    return trim_to_tokens(answer, MAP_SUMMARY_TOKEN_CAP), len(packed)
+
+
+async def map_shards(retrieval: dict, question: str, timer: StageTimer) -> Optional[dict]:
+    """
+    Map step of map-reduce, over every relevant story instead of the top
+    RETRIEVAL_TOP_K: shards of MAP_CHUNK_STORIES are summarized in parallel
+    (at most MAP_CONCURRENCY calls in flight). Returns the reduce prompt,
+    which writes the final briefing from the shard summaries, or None if no
+    shard produced a summary.
+    """
+    stories = retrieval["all_representatives"]
+    shards = [stories[i:i + MAP_CHUNK_STORIES] for i in range(0, len(stories), MAP_CHUNK_STORIES)]
+    print(f"🗺️ Map-reduce: {len(stories)} stories in {len(shards)} shards")
+    
+    semaphore = asyncio.Semaphore(MAP_CONCURRENCY)
+    with timer.stage("map"):
+        summaries = await asyncio.gather(*(summarize_shard(retrieval, question, shard, semaphore)
+                                           for shard in shards))
+    
+    parts = []
+    covered = 0
+    for i, summary in enumerate(summaries, start=1):
+        if summary is None:
+            continue
+        text, packed = summary
+        covered += packed
+        parts.append(f"[Shard {i}/{len(shards)} | {packed} stories]\n{text}")
+    
+    prompt = {
+        "system_prompt": SYSTEM_PROMPT,
+        "user_prompt": (f"Question: {question}\n\nSHARD SUMMARIES ({covered} stories, "
+                        f"bullets cite Source | Reliability | URL):\n" + "\n\n---\n\n".join(parts)),
+        "context": stories[:RETRIEVAL_TOP_K],
+        "sources_analyzed": {
+            **retrieval["sources_analyzed"],
+            "packed": covered,
+            "map_reduce": {"shards": len(shards), "summarized": len(parts), "stories": len(stories)},
+        }
     }
+    return prompt if parts else None
+
+
+async def plan_answer(retrieval: dict, question: str, timer: StageTimer) -> tuple:
+    """
+    Answer mode, shared by pathway_rag_query and pathway_rag_stream.
+    Returns (mode, prompt):
+    - "map_reduce": large result sets, with the map step already run; prompt is the reduce prompt
+    - "geometric": RAG_MODE=geometric; prompt covers the first round's stories
+    - "full": every retrieved story within the token budget
+    """
+    if retrieval["all_representatives"]:
+        prompt = await map_shards(retrieval, question, timer)
+        if prompt is not None:
+            return "map_reduce", prompt
+        print("🔄 Map step produced no summaries, answering from the top stories only")
+    elif RAG_MODE == "geometric":
+        return "geometric", render_prompt(retrieval, question, GEOMETRIC_START_STORIES)
+    return "full", render_prompt(retrieval, question)
+
+
+async def pathway_rag_query(context_items: list, question: str, timer: StageTimer = None,
+                            archive: list = None) -> dict:
+    """
+    Enhanced RAG query: hybrid retrieval + LLM answer. Large result sets go
+    through map-reduce; otherwise full or adaptive depth (see RAG_MODE).
+    """
+    timer = timer or StageTimer()
+    # Retrieval touches SQLite, so keep it off the event loop
+    with timer.stage("context_build"):
+        retrieval = await asyncio.to_thread(retrieve_context, context_items, question, archive)
+    
+    mode, prompt = await plan_answer(retrieval, question, timer)
+    
+    # === STEP 7: Query LLM (fastest healthy provider, hedged past its p95) ===
+    rounds = None
+    if mode == "geometric":
+        result, prompt, rounds = await geometric_rag_query(retrieval, question, timer)
+    else:
+        with timer.stage("reduce" if mode == "map_reduce" else "llm"):
+            result = await llm_router.query(configured_providers(), prompt["system_prompt"], prompt["user_prompt"])
+        if mode == "map_reduce" and result.get("error"):
+            print("🔄 Reduce failed, answering from the top stories only")
+            prompt = render_prompt(retrieval, question)
+            with timer.stage("llm"):
+                result = await llm_router.query(configured_providers(), prompt["system_prompt"], prompt["user_prompt"])
+        
+    # === STEP 8: Add metadata ===
+    result["sources_analyzed"] = prompt["sources_analyzed"]
+    if rounds is not None:
+        result["sources_analyzed"]["rag_rounds"] = rounds
     
     return result
+
+
+def parse_answer_json(text: str):
+    """
+    Validate the model's RAW JSON answer. Strips stray ```json fences.
+    Returns the parsed dict, or None if the answer is not valid JSON.
+    """
+    if not text:
+        return None
+    cleaned = text.strip()
+    if cleaned.startswith("```"):
+        cleaned = cleaned.strip("`")
+        if cleaned.lower().startswith("json"):
+            cleaned = cleaned[4:]
+    try:
+        parsed = json.loads(cleaned)
+    except ValueError:
+        return None
+    return parsed if isinstance(parsed, dict) else None
+
+
+async def stream_gemini(system_prompt: str, user_prompt: str):
+    """Yield answer text chunks from Gemini as they are generated."""
+    if not GEMINI_API_KEY or GEMINI_API_KEY == "your_gemini_api_key":
+        raise RuntimeError("Gemini API key not configured")
+    
+    response = await get_gemini_model().generate_content_async(
+        f"{system_prompt}\n\n{user_prompt}", stream=True,
+        request_options={"timeout": LLM_READ_TIMEOUT}
+    )
+    async for chunk in response:
+        text = getattr(chunk, "text", "")
+        if text:
+            yield text
+
+
+async def stream_groq(system_prompt: str, user_prompt: str):
+    """Yield answer text chunks from Groq's OpenAI-compatible SSE stream."""
+    if not GROQ_API_KEY:
+        raise RuntimeError("Groq API key not configured")
+    
+    payload = _groq_payload(system_prompt, user_prompt, stream=True)
+    async with get_groq_client().stream("POST", GROQ_URL, json=payload) as resp:
+        resp.raise_for_status()
+        async for line in resp.aiter_lines():
+            if not line or not line.startswith("data: "):
+                continue
+            data = line[len("data: "):]
+            if data == "[DONE]":
+                break
+            delta = json.loads(data)["choices"][0].get("delta", {})
+            if delta.get("content"):
+                yield delta["content"]
+
+
+def gemini_configured() -> bool:
+    return bool(GEMINI_API_KEY) and GEMINI_API_KEY != "your_gemini_api_key"
+
+
+# Live providers in preference order; LLM_PROVIDER=replay swaps in the offline stand-in
+register_provider(FunctionProvider(GEMINI_MODEL, query_gemini, stream_gemini, gemini_configured))
+register_provider(FunctionProvider("groq-llama-3.3", query_groq_fallback, stream_groq,
+                                   lambda: bool(GROQ_API_KEY)))
+if LLM_PROVIDER == "replay":
+    set_providers([ReplayProvider()])
+
+
+async def stream_completion(prompt: dict):
+    """
+    Yield (provider name, text chunk) for `prompt` from the best-ranked
+    provider (same ranking as llm_router, not hedged: output is already
+    flowing to the client). Falls back to the next provider only if the
+    previous one fails before producing any output; raises RuntimeError if
+    none produced anything.
+    """
+    error = None
+    for provider in llm_router.order(configured_providers()):
+        produced = False
+        try:
+            async for text in provider.stream(prompt["system_prompt"], prompt["user_prompt"]):
+                produced = True
+                yield provider.name, text
+        except Exception as e:
+            print(f"❌ {provider.name} stream error: {e}")
+            error = str(e)
+            if not produced:
+                continue
+        return
+    raise RuntimeError(error or "All LLMs failed")
+
+
+async def pathway_rag_stream(context_items: list, question: str, timer: StageTimer = None,
+                             archive: list = None):
+    """
+    Streaming variant of pathway_rag_query, with the same answer modes
+    (plan_answer). Yields (event, payload) pairs:
+    - ("retrieval", {...}) as soon as the context is built
+    - ("token", {"text": ...}) for each chunk the model produces
+    - ("final", {...}) once generation ends, with the validated JSON answer
+    Map-reduce streams the reduce call. Geometric rounds hold their first
+    GEOMETRIC_PROBE_CHARS back: if the model starts with its "no data" reply
+    the round is abandoned and retried deeper before any token is sent.
+    """
+    timer = timer or StageTimer()
+    with timer.stage("context_build"):
+        retrieval = await asyncio.to_thread(retrieve_context, context_items, question, archive)
+    yield "retrieval", {
+        "sources_analyzed": retrieval["sources_analyzed"],
+        "context": [
+            {"source": i.get("source"), "text": i.get("text", "")[:200], "url": i.get("url"),
+             "reliability": i.get("reliability", "Unknown")}
+            for i in retrieval["representatives"]
+        ]
+    }
+    
+    mode, prompt = await plan_answer(retrieval, question, timer)
+    depths = geometric_depths(retrieval) if mode == "geometric" else []
+    rounds = []
+    
+    llm_started = time.perf_counter()
+    first_token = None
+    while True:
+        holding = mode == "geometric" and len(rounds) < len(depths) - 1
+        chunks, held = [], []
+        llm, error = None, None
+        try:
+            async with contextlib.aclosing(stream_completion(prompt)) as completion:
+                async for llm, text in completion:
+                    chunks.append(text)
+                    if holding:
+                        held.append(text)
+                        head = "".join(chunks)
+                        if NO_DATA_MARKER in head.lower():
+                            break
+                        if len(head) < GEOMETRIC_PROBE_CHARS:
+                            continue
+                        holding, text = False, "".join(held)
+                    if first_token is None:
+                        first_token = time.perf_counter() - llm_started
+                        timer.add("llm_first_token", first_token)
+                    yield "token", {"text": text}
+        except RuntimeError as e:
+            error = str(e)
+        answer = "".join(chunks)
+        
+        if mode == "geometric":
+            rounds.append(geometric_round(prompt, depths[len(rounds)], retrieval))
+            if holding and answer and lacks_information(answer):
+                print(f"🔁 Not enough information with {rounds[-1]['stories']} stories, retrying deeper")
+                prompt = render_prompt(retrieval, question, depths[len(rounds)])
+                continue
+            if held and holding:
+                # Short answer that ended before the probe length: send it now
+                if first_token is None:
+                    first_token = time.perf_counter() - llm_started
+                    timer.add("llm_first_token", first_token)
+                yield "token", {"text": "".join(held)}
+        elif mode == "map_reduce" and not answer:
+            print("🔄 Reduce failed, answering from the top stories only")
+            mode, prompt = "full", render_prompt(retrieval, question)
+            continue
+        break
+    timer.add("reduce" if mode == "map_reduce" else "llm", time.perf_counter() - llm_started)
+    
+    final = {"answer": answer or None, "llm": llm, "sources_analyzed": prompt["sources_analyzed"]}
+    if rounds:
+        final["sources_analyzed"]["rag_rounds"] = rounds
+    if not answer:
+        final["error"] = error or "All LLMs failed"
+    final["parsed"] = parse_answer_json(answer)
+    final["valid"] = final["parsed"] is not None
+    yield "final", final
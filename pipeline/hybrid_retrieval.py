@@ -0,0 +1,131 @@
+# Hybrid retrieval: BM25 + vector search fused with reciprocal rank fusion
+#
+# Replaces the fixed priority buckets (OPML keyword hits > other keyword
+# hits > vector hits > DB hits > filler). Each retriever produces its own
+# ranking - BM25 over the live candidates, BM25 over the archive (SQLite
+# FTS5), cosine similarity from the vector store - and an item's fused
+# score is sum(weight / (RRF_K + rank)) over the rankings it appears in.
+# The fused score is then multiplied by source, freshness and reliability
+# priors, so context quality no longer depends on which bucket came first.
+
+import math
+import os
+import time
+from typing import Dict, List, Tuple
+
+from pipeline.live_index import term_hits, item_tokens
+
+RRF_K = int(os.getenv("RRF_K", "60"))
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "30"))
+FRESHNESS_HALF_LIFE_HOURS = float(os.getenv("FRESHNESS_HALF_LIFE_HOURS", "24"))
+# 0 ignores age entirely; 1 lets a very old item fall to ~0
+FRESHNESS_WEIGHT = float(os.getenv("FRESHNESS_WEIGHT", "0.5"))
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Relevance cut (separate from candidate depth): an item counts as relevant
+# if it contains this share of the query terms, or is a vector hit at least
+# this similar. Only relevant items can push a query into map-reduce.
+RELEVANCE_MIN_TERM_SHARE = float(os.getenv("RELEVANCE_MIN_TERM_SHARE", "0.6"))
+RELEVANCE_MIN_SIMILARITY = float(os.getenv("RELEVANCE_MIN_SIMILARITY", "0.55"))
+
+# Relative trust per retriever
+RANKING_WEIGHTS = {"live_bm25": 1.0, "archive_bm25": 0.8, "vector": 1.0}
+
+# Multiplicative priors (1.0 = neutral)
+SOURCE_PRIORS = {
+    "opml": 1.2, "gnews": 1.1, "newsdata": 1.1, "newsapi": 1.1, "firecrawl": 1.0,
+    "hackernews": 0.95, "reddit": 0.9, "twitter": 0.9,
+}
+ARCHIVE_PRIOR = 0.9  # Applied on top for archived copies (source + "_db")
+RELIABILITY_PRIORS = {"High": 1.15, "Medium": 1.0, "Low": 0.85, "Unknown": 0.95}
+
+
+def bm25_rank(items: list, terms: List[str]) -> List[Tuple[object, float]]:
+    """
+    BM25 over a candidate list, best first (non-matching items dropped).
+    Tokens are stored as a set, so term frequency is binary; document length
+    is the number of distinct tokens. Long terms match by prefix, as in the
+    live index.
+    """
+    if not items or not terms:
+        return []
+
+    token_sets = [item_tokens(item) for item in items]
+    n = len(items)
+    avg_len = sum(len(t) for t in token_sets) / n or 1.0
+
+    # Document frequency per term within the candidate pool
+    hits = [[term_hits(tokens, [term]) for term in terms] for tokens in token_sets]
+    df = [sum(row[j] for row in hits) for j in range(len(terms))]
+    idf = [math.log(1 + (n - d + 0.5) / (d + 0.5)) for d in df]
+
+    scored = []
+    for item, tokens, row in zip(items, token_sets, hits):
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * len(tokens) / avg_len)
+        score = sum(idf[j] * (BM25_K1 + 1) / (1 + norm) for j, hit in enumerate(row) if hit)
+        if score > 0:
+            scored.append((item, score))
+    scored.sort(key=lambda x: x[1], reverse=True)
+    return scored
+
+
+def relevant_items(fused: List[Tuple[object, float]], terms: List[str], vector_matches: list) -> list:
+    """
+    Fused items (best first) that clear the relevance cut. The retrievers
+    OR-match and return a fixed depth, so the fused pool alone says nothing
+    about how many items actually answer the question.
+    """
+    similar = {item_key(item) for item in vector_matches
+               if item.get('similarity_score', 0.0) >= RELEVANCE_MIN_SIMILARITY}
+    needed = max(1, math.ceil(RELEVANCE_MIN_TERM_SHARE * len(terms)))
+    return [item for item, _ in fused
+            if item_key(item) in similar or (terms and term_hits(item_tokens(item), terms) >= needed)]
+
+
+def item_key(item) -> str:
+    return item.get('url') or item.get('text', '')[:200]
+
+
+def source_prior(source: str) -> float:
+    archived = source.endswith("_db")
+    if archived:
+        source = source[:-3]
+    prior = SOURCE_PRIORS.get(source, SOURCE_PRIORS.get(source.split("_")[0], 1.0))
+    return prior * ARCHIVE_PRIOR if archived else prior
+
+
+def freshness_prior(ts: float, now: float) -> float:
+    if not ts:
+        return 1.0 - FRESHNESS_WEIGHT / 2  # Unknown age: halfway
+    age_hours = max(0.0, now - ts) / 3600
+    return (1.0 - FRESHNESS_WEIGHT) + FRESHNESS_WEIGHT * 0.5 ** (age_hours / FRESHNESS_HALF_LIFE_HOURS)
+
+
+def prior(item, now: float) -> float:
+    return (source_prior(item.get('source', '')) *
+            freshness_prior(item.get('ts', 0.0), now) *
+            RELIABILITY_PRIORS.get(item.get('reliability', 'Unknown'), 1.0))
+
+
+def fuse(rankings: Dict[str, list], top_k: int = RETRIEVAL_TOP_K) -> List[Tuple[object, float]]:
+    """
+    Reciprocal rank fusion of {retriever name: items best-first}, times priors.
+    The first copy of an item seen (by URL) is the one returned.
+    """
+    now = time.time()
+    fused: Dict[str, float] = {}
+    first: Dict[str, object] = {}
+    for name, ranked in rankings.items():
+        weight = RANKING_WEIGHTS.get(name, 1.0)
+        for rank, item in enumerate(ranked, start=1):
+            key = item_key(item)
+            if not key:
+                continue
+            fused[key] = fused.get(key, 0.0) + weight / (RRF_K + rank)
+            first.setdefault(key, item)
+
+    scored = [(first[key], score * prior(first[key], now)) for key, score in fused.items()]
+    scored.sort(key=lambda x: x[1], reverse=True)
+    return scored[:top_k]
@@ -0,0 +1,163 @@
+# Live window with an incrementally maintained inverted index
+#
+# Replaces the bare deque in data_store["items"]. Tokens are computed once
+# when an Article is built; here we only keep token -> item id postings,
+# updated on append and on eviction, so keyword retrieval is a postings
+# lookup instead of a lowercase + substring scan over every live item.
+
+import bisect
+from collections import deque, defaultdict
+from typing import Dict, Iterable, List, Optional
+
+from ingest.article import tokenize
+
+# Terms shorter than this match whole tokens only ("ai" must not match "aid");
+# longer terms also match as a prefix ("regulat" -> "regulation", "regulations")
+PREFIX_MIN_LEN = 4
+
+STOPWORDS = frozenset({
+    "a", "an", "and", "are", "as", "at", "be", "by", "did", "do", "does",
+    "for", "from", "has", "have", "how", "in", "is", "it", "its", "latest",
+    "me", "news", "of", "on", "or", "tell", "that", "the", "this",
+    "to", "today", "was", "were", "what", "when", "where", "which",
+    "who", "why", "will", "with", "about", "happening", "going",
+})
+
+
+def query_terms(query: str) -> List[str]:
+    """Tokenize a user query the same way articles are tokenized, minus stopwords."""
+    tokens = tokenize(query)
+    terms = [t for t in tokens if t not in STOPWORDS] or tokens
+    # Keep order, drop duplicates
+    return list(dict.fromkeys(terms))
+
+
+def term_hits(tokens: Iterable[str], terms: List[str]) -> int:
+    """Number of query terms matched by an item's token set (non-indexed path)."""
+    hits = 0
+    for term in terms:
+        if term in tokens:
+            hits += 1
+        elif len(term) >= PREFIX_MIN_LEN and any(t.startswith(term) for t in tokens):
+            hits += 1
+    return hits
+
+
+def item_tokens(item) -> frozenset:
+    """Precomputed tokens for Articles; tokenized on the fly for plain dicts."""
+    tokens = item.get('tokens')
+    if tokens is None:
+        tokens = frozenset(tokenize(f"{item.get('text', '')} {item.get('url', '')}"))
+    return tokens
+
+
+class LiveIndex:
+    """
+    Bounded window of live Articles (oldest evicted first) plus an inverted
+    index from token to item ids. Item ids are monotonically increasing, so
+    a higher id is always a newer item.
+
+    Not thread-safe on its own - callers hold data_lock, as with the deque.
+    """
+
+    def __init__(self, maxlen: int = 500, first_id: int = 0):
+        self.maxlen = maxlen
+        self._items = deque()  # (item_id, article), oldest first
+        self._by_id: Dict[int, object] = {}
+        self._postings = defaultdict(set)  # token -> {item_id}
+        self._next_id = first_id
+        self._vocab: Optional[List[str]] = None  # Sorted token list for prefix lookups
+
+    # --- deque-compatible surface ---
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __iter__(self):
+        return (item for _, item in self._items)
+
+    def append(self, item) -> int:
+        """Add an item, evicting the oldest if the window is full. Returns its id."""
+        if len(self._items) >= self.maxlen:
+            self._evict()
+
+        item_id = self._next_id
+        self._next_id += 1
+        self._items.append((item_id, item))
+        self._by_id[item_id] = item
+
+        for token in item_tokens(item):
+            postings = self._postings[token]
+            if not postings:
+                self._vocab = None
+            postings.add(item_id)
+        return item_id
+
+    def _evict(self):
+        item_id, item = self._items.popleft()
+        del self._by_id[item_id]
+        for token in item_tokens(item):
+            postings = self._postings.get(token)
+            if postings is None:
+                continue
+            postings.discard(item_id)
+            if not postings:
+                del self._postings[token]
+                self._vocab = None
+
+    @property
+    def last_id(self) -> int:
+        """Id of the newest item (first_id - 1 when empty)."""
+        return self._next_id - 1
+
+    def get(self, item_id: int):
+        return self._by_id.get(item_id)
+
+    def items_since(self, since_id: int) -> list:
+        """Items appended after `since_id` that are still in the window (oldest first)."""
+        newer = []
+        for item_id, item in reversed(self._items):
+            if item_id <= since_id:
+                break
+            newer.append(item)
+        newer.reverse()
+        return newer
+
+    # --- retrieval ---
+    def _term_postings(self, term: str) -> set:
+        """Ids of items containing the term (prefix-expanded for long terms)."""
+        if len(term) < PREFIX_MIN_LEN:
+            return self._postings.get(term, set())
+
+        if self._vocab is None:
+            self._vocab = sorted(self._postings)
+        vocab = self._vocab
+        ids = set()
+        i = bisect.bisect_left(vocab, term)
+        while i < len(vocab) and vocab[i].startswith(term):
+            ids |= self._postings[vocab[i]]
+            i += 1
+        return ids
+
+    def match(self, terms: List[str], require_all: bool = False) -> Dict[int, int]:
+        """
+        Map of item id -> number of distinct terms matched.
+        With require_all=True this is a postings-list intersection.
+        """
+        if not terms:
+            return {}
+
+        if require_all:
+            postings = sorted((self._term_postings(t) for t in terms), key=len)
+            ids = set(postings[0]).intersection(*postings[1:])
+            return {item_id: len(terms) for item_id in ids}
+
+        hits: Dict[int, int] = defaultdict(int)
+        for term in terms:
+            for item_id in self._term_postings(term):
+                hits[item_id] += 1
+        return dict(hits)
+
+    def search(self, terms: List[str], require_all: bool = False) -> list:
+        """Matching items in window order (oldest first), like the old linear scan."""
+        hits = self.match(terms, require_all=require_all)
+        return [self._by_id[item_id] for item_id in sorted(hits)]
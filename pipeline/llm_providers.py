@@ -0,0 +1,234 @@
+# Pluggable LLM providers
+#
+# Every model the RAG pipeline can call is an LLMProvider with the same
+# two async entry points: query() for a whole answer and stream() for text
+# chunks. Gemini and Groq are registered by pipeline/gemini_rag.py; the
+# router (pipeline/llm_router.py) only sees this interface.
+#
+# ReplayProvider is an offline stand-in: it answers from recorded responses
+# (JSONL written by RecordingProvider during live sessions) after a delay
+# drawn from a configurable latency distribution, so /query can be
+# benchmarked reproducibly without API keys or provider variance.
+# Set LLM_PROVIDER=replay to serve the app with it.
+
+import abc
+import asyncio
+import json
+import math
+import os
+import random
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import AsyncIterator, Callable, List, Optional
+
+from pipeline.answer_cache import normalize_query
+
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "live")  # live | replay
+LLM_REPLAY_FILE = os.getenv("LLM_REPLAY_FILE", "")
+LLM_RECORD_FILE = os.getenv("LLM_RECORD_FILE", "")
+# fixed | lognormal | recorded (each recording's own latency_ms)
+LLM_REPLAY_LATENCY = os.getenv("LLM_REPLAY_LATENCY", "lognormal")
+LLM_REPLAY_P50_MS = float(os.getenv("LLM_REPLAY_P50_MS", "900"))
+LLM_REPLAY_P95_MS = float(os.getenv("LLM_REPLAY_P95_MS", "2500"))
+LLM_REPLAY_ERROR_RATE = float(os.getenv("LLM_REPLAY_ERROR_RATE", "0"))
+LLM_REPLAY_SEED = int(os.getenv("LLM_REPLAY_SEED", "42"))
+REPLAY_FIRST_TOKEN_SHARE = 0.3  # Streaming: share of the latency before the first chunk
+REPLAY_STREAM_CHUNKS = 8
+
+Z_95 = 1.6449  # Standard normal 95th percentile
+
+
+def prompt_question(user_prompt: str) -> str:
+    """The question line of a RAG user prompt ('Question: ...')."""
+    first = user_prompt.split("\n", 1)[0]
+    return first[len("Question:"):].strip() if first.startswith("Question:") else first.strip()
+
+
+class LLMProvider(abc.ABC):
+    """
+    Interface for one model backend. query() returns {"answer", "llm"} or
+    {"error", "answer": None}; stream() yields answer text and raises on failure.
+    """
+
+    name = "provider"
+
+    def configured(self) -> bool:
+        return True
+
+    @abc.abstractmethod
+    async def query(self, system_prompt: str, user_prompt: str) -> dict:
+        ...
+
+    async def stream(self, system_prompt: str, user_prompt: str) -> AsyncIterator[str]:
+        """Default: the whole answer as one chunk."""
+        result = await self.query(system_prompt, user_prompt)
+        if result.get("error"):
+            raise RuntimeError(result["error"])
+        yield result["answer"]
+
+
+class FunctionProvider(LLMProvider):
+    """Provider built from plain async functions (the Gemini / Groq clients)."""
+
+    def __init__(self, name: str, query: Callable, stream: Callable = None,
+                 configured: Callable[[], bool] = None):
+        self.name = name
+        self._query = query
+        self._stream = stream
+        self._configured = configured
+
+    def configured(self) -> bool:
+        return self._configured() if self._configured else True
+
+    async def query(self, system_prompt: str, user_prompt: str) -> dict:
+        return await self._query(system_prompt, user_prompt)
+
+    async def stream(self, system_prompt: str, user_prompt: str):
+        if self._stream is None:
+            async for text in super().stream(system_prompt, user_prompt):
+                yield text
+            return
+        async for text in self._stream(system_prompt, user_prompt):
+            yield text
+
+
+class RecordingProvider(LLMProvider):
+    """Wraps a live provider and appends every successful answer to a JSONL file."""
+
+    _lock = threading.Lock()
+
+    def __init__(self, inner: LLMProvider, path: str):
+        self.inner = inner
+        self.name = inner.name
+        self.path = Path(path)
+
+    def configured(self) -> bool:
+        return self.inner.configured()
+
+    def _record(self, user_prompt: str, answer: str, llm: str, seconds: float):
+        record = {"question": prompt_question(user_prompt), "answer": answer, "llm": llm,
+                  "latency_ms": round(seconds * 1000, 1), "recorded_at": time.time()}
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+
+    async def query(self, system_prompt: str, user_prompt: str) -> dict:
+        start = time.perf_counter()
+        result = await self.inner.query(system_prompt, user_prompt)
+        if not result.get("error"):
+            self._record(user_prompt, result["answer"], result.get("llm", self.name),
+                         time.perf_counter() - start)
+        return result
+
+    async def stream(self, system_prompt: str, user_prompt: str):
+        start = time.perf_counter()
+        chunks = []
+        async for text in self.inner.stream(system_prompt, user_prompt):
+            chunks.append(text)
+            yield text
+        self._record(user_prompt, "".join(chunks), self.name, time.perf_counter() - start)
+
+
+class ReplayProvider(LLMProvider):
+    """
+    Offline provider: answers from recordings (matched by normalized question,
+    else picked deterministically by hash), or a synthetic JSON briefing when
+    there are none. Latency and failures follow the configured distribution,
+    drawn from a seeded RNG so runs are reproducible.
+    """
+
+    name = "replay"
+
+    def __init__(self, path: str = LLM_REPLAY_FILE, latency: str = LLM_REPLAY_LATENCY,
+                 p50_ms: float = LLM_REPLAY_P50_MS, p95_ms: float = LLM_REPLAY_P95_MS,
+                 error_rate: float = LLM_REPLAY_ERROR_RATE, seed: int = LLM_REPLAY_SEED):
+        self.latency = latency
+        self.p50 = p50_ms / 1000
+        # Lognormal with the given median and 95th percentile
+        self.sigma = math.log(max(p95_ms, p50_ms) / p50_ms) / Z_95 if p50_ms > 0 else 0.0
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+        self.recordings: List[dict] = []
+        self._by_question = {}
+        if path:
+            self.load(path)
+
+    def load(self, path: str):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    self.recordings.append(record)
+                    self._by_question.setdefault(normalize_query(record.get("question", "")), record)
+        print(f"📼 Replay provider: {len(self.recordings)} recorded responses from {path}")
+
+    def _recording(self, question: str) -> Optional[dict]:
+        record = self._by_question.get(normalize_query(question))
+        if record is None and self.recordings:
+            record = self.recordings[zlib.crc32(question.encode("utf-8")) % len(self.recordings)]
+        return record
+
+    def _delay(self, record: Optional[dict]) -> float:
+        if self.latency == "recorded" and record and record.get("latency_ms") is not None:
+            return record["latency_ms"] / 1000
+        if self.latency == "fixed" or self.sigma == 0:
+            return self.p50
+        return self._rng.lognormvariate(math.log(self.p50), self.sigma)
+
+    def _answer(self, question: str, user_prompt: str, record: Optional[dict]) -> str:
+        if record:
+            return record["answer"]
+        blocks = user_prompt.count("[Source: ")
+        return json.dumps({
+            "summary": f"Replayed briefing for '{question}' from {blocks} context items.",
+            "findings": [],
+            "sources": [],
+            "reliability": "Unknown",
+        })
+
+    def _plan(self, user_prompt: str):
+        question = prompt_question(user_prompt)
+        record = self._recording(question)
+        failed = self._rng.random() < self.error_rate
+        return question, record, self._delay(record), failed
+
+    async def query(self, system_prompt: str, user_prompt: str) -> dict:
+        question, record, delay, failed = self._plan(user_prompt)
+        await asyncio.sleep(delay)
+        if failed:
+            return {"error": "replayed provider error", "answer": None}
+        return {"answer": self._answer(question, user_prompt, record), "llm": self.name}
+
+    async def stream(self, system_prompt: str, user_prompt: str):
+        question, record, delay, failed = self._plan(user_prompt)
+        await asyncio.sleep(delay * REPLAY_FIRST_TOKEN_SHARE)
+        if failed:
+            raise RuntimeError("replayed provider error")
+        answer = self._answer(question, user_prompt, record)
+        size = max(1, math.ceil(len(answer) / REPLAY_STREAM_CHUNKS))
+        rest = delay * (1 - REPLAY_FIRST_TOKEN_SHARE) / REPLAY_STREAM_CHUNKS
+        for start in range(0, len(answer), size):
+            if start:
+                await asyncio.sleep(rest)
+            yield answer[start:start + size]
+
+
+# Providers in preference order (the router re-ranks them by observed latency)
+_providers: List[LLMProvider] = []
+
+
+def register_provider(provider: LLMProvider):
+    if LLM_RECORD_FILE and not isinstance(provider, ReplayProvider):
+        provider = RecordingProvider(provider, LLM_RECORD_FILE)
+    _providers.append(provider)
+
+
+def set_providers(providers: List[LLMProvider]):
+    """Replace every registered provider (replay mode, benchmarks)."""
+    _providers[:] = providers
+
+
+def configured_providers() -> List[LLMProvider]:
+    """Registered providers that have what they need to run (e.g. an API key)."""
+    return [p for p in _providers if p.configured()]
@@ -0,0 +1,172 @@
+# Hedged, latency-aware routing across LLM providers
+#
+# Groq used to be tried only after Gemini had fully failed, so a slow Gemini
+# answer cost its whole timeout before the fallback even started. The router
+# keeps a rolling window of latency and outcomes per provider and orders
+# providers by health, then p50. The first choice is called right away; if it
+# hasn't answered by its own p95, a hedged request goes to the next provider
+# and whichever succeeds first wins (the other is cancelled). A failure
+# launches the next provider immediately instead of waiting for the hedge.
+
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+from pipeline.llm_providers import LLMProvider
+from pipeline.timing import _percentile
+
+LLM_STATS_WINDOW = int(os.getenv("LLM_STATS_WINDOW", "100"))
+# Until a provider has this many successful samples, hedge after the default delay
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+LLM_HEDGE_DEFAULT_DELAY = float(os.getenv("LLM_HEDGE_DEFAULT_DELAY", "4"))
+LLM_HEDGE_MIN_DELAY = float(os.getenv("LLM_HEDGE_MIN_DELAY", "0.5"))
+# Providers failing more often than this are tried last
+LLM_MAX_ERROR_RATE = float(os.getenv("LLM_MAX_ERROR_RATE", "0.5"))
+
+
+class ProviderStats:
+    """Rolling latency (successful calls, seconds) and outcomes for one provider."""
+
+    def __init__(self, window: int = LLM_STATS_WINDOW):
+        self.latencies = deque(maxlen=window)
+        self.outcomes = deque(maxlen=window)  # True = success
+        self.cancelled = 0
+
+    def record(self, seconds: float, ok: bool):
+        self.outcomes.append(ok)
+        if ok:
+            self.latencies.append(seconds)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        if not self.latencies:
+            return None
+        return _percentile(sorted(self.latencies), pct)
+
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return 1.0 - sum(self.outcomes) / len(self.outcomes)
+
+    def snapshot(self) -> dict:
+        p50, p95 = self.percentile(50), self.percentile(95)
+        return {
+            "samples": len(self.latencies),
+            "p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+            "error_rate": round(self.error_rate(), 3),
+            "cancelled": self.cancelled,
+        }
+
+
+class LLMRouter:
+    def __init__(self):
+        self._stats: Dict[str, ProviderStats] = {}
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def stats_for(self, name: str) -> ProviderStats:
+        with self._lock:
+            if name not in self._stats:
+                self._stats[name] = ProviderStats()
+            return self._stats[name]
+
+    def order(self, providers: List[LLMProvider]) -> List[LLMProvider]:
+        """
+        Providers sorted best first: healthy before failing, then by p50.
+        Providers without samples yet sort as fastest, so they get measured.
+        """
+        def rank(entry):
+            index, provider = entry
+            stats = self.stats_for(provider.name)
+            return (stats.error_rate() > LLM_MAX_ERROR_RATE, stats.percentile(50) or 0.0, index)
+        return [provider for _, provider in sorted(enumerate(providers), key=rank)]
+
+    def hedge_delay(self, name: str) -> float:
+        stats = self.stats_for(name)
+        p95 = stats.percentile(95) if len(stats.latencies) >= LLM_HEDGE_MIN_SAMPLES else None
+        return max(LLM_HEDGE_MIN_DELAY, p95 if p95 is not None else LLM_HEDGE_DEFAULT_DELAY)
+
+    async def _call(self, provider: LLMProvider, system_prompt: str, user_prompt: str) -> dict:
+        stats = self.stats_for(provider.name)
+        start = time.perf_counter()
+        try:
+            result = await provider.query(system_prompt, user_prompt)
+        except asyncio.CancelledError:
+            # Lost a hedge race: not an error, but it was at least this slow
+            stats.cancelled += 1
+            stats.latencies.append(time.perf_counter() - start)
+            raise
+        except Exception as e:
+            result = {"error": str(e), "answer": None}
+        stats.record(time.perf_counter() - start, not result.get("error"))
+        return result
+
+    async def query(self, providers: List[LLMProvider], system_prompt: str, user_prompt: str) -> dict:
+        """First successful answer across `providers`, hedging slow ones."""
+        remaining = self.order(providers)
+        if not remaining:
+            return {"error": "No LLM provider configured", "answer": None}
+        self.requests += 1
+
+        pending: Dict[asyncio.Task, Tuple[str, bool]] = {}  # task -> (provider, is hedge)
+        last_launch = 0.0
+        last_name = None
+        error = None
+
+        def launch(hedge: bool = False):
+            nonlocal last_launch, last_name
+            provider = remaining.pop(0)
+            task = asyncio.create_task(self._call(provider, system_prompt, user_prompt))
+            pending[task] = (provider.name, hedge)
+            last_launch, last_name = time.perf_counter(), provider.name
+
+        launch()
+        try:
+            while pending:
+                timeout = None
+                if remaining:
+                    waited = time.perf_counter() - last_launch
+                    timeout = max(0.0, self.hedge_delay(last_name) - waited)
+                done, _ = await asyncio.wait(pending, timeout=timeout,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    print(f"⏱️ {last_name} past its p95, hedging with {remaining[0].name}")
+                    self.hedges += 1
+                    launch(hedge=True)
+                    continue
+
+                for task in done:
+                    name, hedge = pending.pop(task)
+                    result = task.result()
+                    if not result.get("error"):
+                        if hedge:
+                            self.hedge_wins += 1
+                        return result
+                    print(f"❌ {name} failed: {result['error']}")
+                    error = result["error"]
+                if remaining:
+                    launch()
+            return {"error": error or "All LLMs failed", "answer": None}
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            names = list(self._stats)
+        return {
+            "requests": self.requests,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "providers": {name: self.stats_for(name).snapshot() for name in names},
+        }
+
+
+llm_router = LLMRouter()
@@ -0,0 +1,131 @@
+# Admission control for LLM-bound /query work
+#
+# At most QUERY_MAX_CONCURRENT pipelines run at once; the rest wait in a
+# fair queue that is served round-robin across clients, so one client
+# firing a burst cannot starve everyone else. When the queue is full, or a
+# client already has QUERY_PER_CLIENT_LIMIT requests queued/running, the
+# request is shed immediately with SchedulerBusy instead of piling onto the
+# providers and failing slowly at their rate limits.
+
+import asyncio
+import math
+import os
+from collections import OrderedDict, deque, defaultdict
+
+QUERY_MAX_CONCURRENT = int(os.getenv("QUERY_MAX_CONCURRENT", "8"))
+QUERY_MAX_QUEUE = int(os.getenv("QUERY_MAX_QUEUE", "32"))
+QUERY_PER_CLIENT_LIMIT = int(os.getenv("QUERY_PER_CLIENT_LIMIT", "4"))
+# Give up on a queued request after this long (seconds)
+QUERY_QUEUE_TIMEOUT = float(os.getenv("QUERY_QUEUE_TIMEOUT", "20"))
+
+
+class SchedulerBusy(Exception):
+    """Raised when a request is shed; `retry_after` is a hint in seconds."""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class QueryScheduler:
+    """
+    Bounded concurrency pool with a per-client round-robin wait queue.
+    Single event loop only (all methods are called from async handlers).
+    """
+
+    def __init__(self, max_concurrent: int = QUERY_MAX_CONCURRENT, max_queue: int = QUERY_MAX_QUEUE,
+                 per_client: int = QUERY_PER_CLIENT_LIMIT, queue_timeout: float = QUERY_QUEUE_TIMEOUT):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.per_client = per_client
+        self.queue_timeout = queue_timeout
+        self.running = 0
+        self._queues = OrderedDict()  # client -> deque of waiting futures (round-robin order)
+        self._queued = 0
+        self._per_client = defaultdict(int)  # client -> queued + running
+        self._avg_service = 5.0  # EWMA of slot hold time, seeds Retry-After
+        self.admitted = 0
+        self.shed = 0
+
+    def _retry_after(self) -> int:
+        waves = (self._queued + 1) / max(self.max_concurrent, 1)
+        return max(1, math.ceil(waves * self._avg_service))
+
+    def check(self, client: str):
+        """Shed early (raise SchedulerBusy) if `client` could not be admitted or queued."""
+        if self._per_client.get(client, 0) >= self.per_client:
+            self.shed += 1
+            raise SchedulerBusy("too many concurrent queries from this client", self._retry_after())
+        if self.running >= self.max_concurrent and self._queued >= self.max_queue:
+            self.shed += 1
+            raise SchedulerBusy("server busy, query queue is full", self._retry_after())
+
+    async def acquire(self, client: str):
+        self.check(client)
+        self._per_client[client] += 1
+        if self.running < self.max_concurrent and not self._queued:
+            self.running += 1
+            self.admitted += 1
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(client, deque()).append(waiter)
+        self._queued += 1
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # Slot was granted just as we gave up - hand it on
+                self.release(client)
+            else:
+                waiter.cancel()
+                self._drop_waiter(client, waiter)
+                self._per_client_done(client)
+            if isinstance(e, asyncio.TimeoutError):
+                self.shed += 1
+                raise SchedulerBusy("timed out waiting for a query slot", self._retry_after())
+            raise
+        self.admitted += 1
+
+    def _drop_waiter(self, client: str, waiter):
+        queue = self._queues.get(client)
+        if queue and waiter in queue:
+            queue.remove(waiter)
+            self._queued -= 1
+            if not queue:
+                del self._queues[client]
+
+    def _per_client_done(self, client: str):
+        self._per_client[client] -= 1
+        if self._per_client[client] <= 0:
+            del self._per_client[client]
+
+    def release(self, client: str, held: float = None):
+        if held is not None:
+            self._avg_service = 0.8 * self._avg_service + 0.2 * held
+        self._per_client_done(client)
+        self.running -= 1
+
+        # Hand the slot to the next client in round-robin order
+        while self._queues and self.running < self.max_concurrent:
+            next_client, queue = next(iter(self._queues.items()))
+            waiter = queue.popleft()
+            self._queued -= 1
+            if queue:
+                self._queues.move_to_end(next_client)
+            else:
+                del self._queues[next_client]
+            if not waiter.done():
+                self.running += 1
+                waiter.set_result(True)
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "queued": self._queued,
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "shed": self.shed,
+        }
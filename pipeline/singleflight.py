@@ -0,0 +1,65 @@
+# Single-flight coalescing of concurrent identical queries
+#
+# When many clients ask the same question at once, only the first request
+# starts the pipeline; the rest attach to its in-flight task and share the
+# result. Provider/API load then scales with distinct questions, not users.
+
+import asyncio
+from typing import Awaitable, Callable, Optional, Tuple
+
+
+class _Flight:
+    __slots__ = ("task", "waiters", "abandoned")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+        self.abandoned = False
+
+
+class SingleFlight:
+    """
+    Registry of in-flight pipeline tasks keyed by the normalized question.
+    The shared task is only cancelled when every attached client has gone
+    away, so one disconnect does not fail the others.
+    """
+
+    def __init__(self):
+        self._flights = {}  # key -> _Flight
+
+    def running(self, key: str) -> Optional[asyncio.Task]:
+        flight = self._flights.get(key)
+        return flight.task if flight else None
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[dict]]) -> Tuple[dict, bool]:
+        """
+        Await fn() once per key across concurrent callers.
+        Returns (result, shared) - shared is True for callers that attached
+        to another request's run (they get their own shallow copy).
+        """
+        flight = self._flights.get(key)
+        if flight is not None and (flight.abandoned or flight.task.done()):
+            flight = None  # Being cancelled, or finished - start a fresh run
+        shared = flight is not None
+        if not shared:
+            flight = _Flight(asyncio.ensure_future(fn()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _: self._release(key, flight))
+
+        flight.waiters += 1
+        try:
+            result = await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # Every client attached to this run disconnected
+                flight.abandoned = True
+                flight.task.cancel()
+        return (dict(result) if shared else result), shared
+
+    def _release(self, key: str, flight: _Flight):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    def in_flight(self) -> int:
+        return len(self._flights)
@@ -0,0 +1,105 @@
+# Story clustering for RAG context
+#
+# Ten outlets carrying the same headline used to reach the prompt as ten
+# context blocks, and the LLM was asked to de-duplicate them itself. Items
+# are now grouped by story before packing: each item's lead words are
+# MinHashed, LSH banding proposes candidate pairs, and an item joins a story
+# when its estimated Jaccard similarity to the story's representative clears
+# STORY_CLUSTER_THRESHOLD. Only the best-ranked item of each story is sent,
+# annotated with the other outlets (and their reliability) that corroborate it.
+
+import os
+import zlib
+from typing import Dict, List
+
+import numpy as np
+
+from ingest.article import tokenize
+from pipeline.live_index import STOPWORDS
+
+STORY_CLUSTER_THRESHOLD = float(os.getenv("STORY_CLUSTER_THRESHOLD", "0.4"))
+# 20 bands x 3 rows: pairs around the threshold (~0.37) become candidates
+MINHASH_BANDS = 20
+MINHASH_ROWS = 3
+NUM_PERM = MINHASH_BANDS * MINHASH_ROWS
+# Compare on the lead only, so a long scrape and a headline can still match
+LEAD_TOKENS = 60
+MAX_CORROBORATING = 6  # Outlets listed per story in the prompt
+
+_PRIME = np.uint64((1 << 31) - 1)
+_rng = np.random.default_rng(0x5eed)  # Fixed seed: signatures are comparable across calls
+_PERM_A = _rng.integers(1, int(_PRIME), NUM_PERM, dtype=np.uint64)
+_PERM_B = _rng.integers(0, int(_PRIME), NUM_PERM, dtype=np.uint64)
+
+
+def story_tokens(item) -> set:
+    """Content words from the lead of an item's text (URL and stopwords excluded)."""
+    words = [t for t in tokenize(item.get('text', '')) if t not in STOPWORDS and len(t) > 1]
+    return set(words[:LEAD_TOKENS])
+
+
+def minhash(tokens: set) -> np.ndarray:
+    """NUM_PERM-long MinHash signature (all-max for an empty set)."""
+    if not tokens:
+        return np.full(NUM_PERM, _PRIME, dtype=np.uint64)
+    # crc32 is stable across processes, unlike hash()
+    x = np.array([zlib.crc32(t.encode("utf-8")) for t in tokens], dtype=np.uint64)
+    hashed = (np.outer(x, _PERM_A) + _PERM_B) % _PRIME
+    return hashed.min(axis=0)
+
+
+def cluster_stories(items: list, threshold: float = STORY_CLUSTER_THRESHOLD) -> List[list]:
+    """
+    Group items (best first) into stories. Returns one member list per
+    story, each best first, ordered by its best member - so clusters[i][0]
+    is the representative and the representatives keep the input ranking.
+    """
+    n = len(items)
+    if n < 2:
+        return [[item] for item in items]
+
+    token_sets = [story_tokens(item) for item in items]
+    signatures = np.stack([minhash(tokens) for tokens in token_sets])
+
+    # === LSH: items sharing any band are candidates ===
+    candidates: List[set] = [set() for _ in range(n)]
+    for band in range(MINHASH_BANDS):
+        buckets: Dict[bytes, List[int]] = {}
+        rows = signatures[:, band * MINHASH_ROWS:(band + 1) * MINHASH_ROWS]
+        for i in range(n):
+            if token_sets[i]:
+                buckets.setdefault(rows[i].tobytes(), []).append(i)
+        for members in buckets.values():
+            for i in members:
+                candidates[i].update(members)
+
+    # === Assign best first: join the best-ranked representative the item itself matches ===
+    # Comparing with the representative (not any member) avoids single-linkage
+    # chaining, where A~B and B~C pull a dissimilar A and C into one story
+    clusters: Dict[int, list] = {}
+    for i in range(n):
+        for rep in sorted(j for j in candidates[i] if j < i and j in clusters):
+            if float(np.mean(signatures[i] == signatures[rep])) >= threshold:
+                clusters[rep].append(items[i])
+                break
+        else:
+            clusters[i] = [items[i]]
+    return [clusters[rep] for rep in sorted(clusters)]
+
+
+def outlet_name(item) -> str:
+    return item.get('feed_title') or item.get('source', 'unknown')
+
+
+def corroboration(cluster: list) -> List[str]:
+    """'Outlet (Reliability)' for the other members of a story, one per outlet."""
+    lead = outlet_name(cluster[0])
+    seen = set()
+    labels = []
+    for item in cluster[1:]:
+        name = outlet_name(item)
+        if name == lead or name in seen:
+            continue
+        seen.add(name)
+        labels.append(f"{name} ({item.get('reliability', 'Unknown')})")
+    return labels[:MAX_CORROBORATING]
@@ -0,0 +1,91 @@
+# Per-stage latency timing for /query
+#
+# A StageTimer is created per request and threaded through the pipeline;
+# each stage is measured with time.perf_counter (monotonic) and returned to
+# the client as a `timings` block in milliseconds. Finished timers are fed
+# into a process-wide LatencyStats that keeps a rolling window of samples
+# per stage and serves percentiles + histograms via /metrics/latency.
+
+import threading
+import time
+from collections import deque, defaultdict
+from contextlib import contextmanager
+from typing import Dict
+
+# Histogram bucket upper bounds in ms (last bucket is open-ended)
+LATENCY_BUCKETS_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+LATENCY_WINDOW = 1000  # Samples kept per stage
+
+
+class StageTimer:
+    """Collects wall time per pipeline stage for a single request."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages: Dict[str, float] = {}  # stage -> seconds
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name: str, seconds: float):
+        """Record (or accumulate) a stage duration measured elsewhere."""
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def since_start(self) -> float:
+        return time.perf_counter() - self.started
+
+    def as_dict(self) -> dict:
+        """Stage timings in ms plus the total elapsed since the timer started."""
+        timings = {name: round(sec * 1000, 1) for name, sec in self.stages.items()}
+        timings["total"] = round(self.since_start() * 1000, 1)
+        return timings
+
+
+def _percentile(sorted_values: list, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[idx]
+
+
+class LatencyStats:
+    """Rolling per-stage latency samples (ms), safe to update from any thread."""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self.window = window
+        self._samples = defaultdict(lambda: deque(maxlen=self.window))
+        self._lock = threading.Lock()
+
+    def record(self, timings: dict):
+        with self._lock:
+            for name, ms in timings.items():
+                self._samples[name].append(ms)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            samples = {name: sorted(values) for name, values in self._samples.items()}
+
+        report = {}
+        for name, values in samples.items():
+            buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+            for ms in values:
+                i = 0
+                while i < len(LATENCY_BUCKETS_MS) and ms > LATENCY_BUCKETS_MS[i]:
+                    i += 1
+                buckets[i] += 1
+            labels = [f"<={b}" for b in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]}"]
+            report[name] = {
+                "count": len(values),
+                "p50": _percentile(values, 50),
+                "p90": _percentile(values, 90),
+                "p95": _percentile(values, 95),
+                "p99": _percentile(values, 99),
+                "max": values[-1] if values else 0.0,
+                "histogram_ms": dict(zip(labels, buckets)),
+            }
+        return report
@@ -0,0 +1,199 @@
+# Continuously materialized topic briefings
+#
+# The dashboard's topics are asked about constantly, and each request used
+# to recompute from scratch. A background task now keeps one briefing per
+# hot topic (requested within BRIEFING_HOT_SECONDS) up to date. A topic is
+# regenerated when BRIEFING_MIN_NEW_ITEMS new live items match it, or when
+# any have arrived and the briefing is older than BRIEFING_MAX_AGE - but
+# never more often than every BRIEFING_MIN_INTERVAL (doubling after each
+# failed attempt), so LLM runs per topic per hour are bounded however many
+# users are reading and whether or not the runs succeed. Briefings are
+# stored in SQLite with their provenance and served from memory.
+
+import asyncio
+import os
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+
+from data.database import load_briefings, save_briefing
+
+# Dashboard topics (/filter_topic) and the keywords that match them
+TOPIC_KEYWORDS = {
+    "technology": ["tech", "ai", "software", "google", "apple", "microsoft", "meta", "computer", "startup", "app", "digital", "internet", "cloud", "data", "cyber", "robot", "programming", "developer"],
+    "politics": ["trump", "biden", "election", "congress", "senate", "government", "president", "minister", "parliament", "political", "policy", "vote", "law", "legislation", "democrat", "republican", "modi", "putin"],
+    "business": ["market", "stock", "economy", "company", "ceo", "finance", "investment", "bank", "trade", "revenue", "profit", "merger", "acquisition", "startup", "ipo"],
+    "sports": ["football", "soccer", "basketball", "cricket", "tennis", "nba", "nfl", "fifa", "match", "game", "player", "team", "championship", "olympics", "win", "score"],
+    "entertainment": ["movie", "film", "music", "celebrity", "hollywood", "bollywood", "actor", "singer", "album", "concert", "netflix", "streaming", "show", "series"],
+    "health": ["health", "medical", "doctor", "hospital", "disease", "vaccine", "covid", "mental", "fitness", "medicine", "treatment", "patient", "wellness"],
+    "science": ["science", "research", "study", "nasa", "space", "discovery", "climate", "environment", "biology", "physics", "chemistry", "scientist"],
+    "world": ["international", "global", "war", "conflict", "china", "russia", "ukraine", "india", "europe", "asia", "africa", "foreign", "diplomacy"]
+}
+
+BRIEFING_MIN_NEW_ITEMS = int(os.getenv("BRIEFING_MIN_NEW_ITEMS", "5"))
+BRIEFING_MAX_AGE = float(os.getenv("BRIEFING_MAX_AGE", "900"))
+BRIEFING_MIN_INTERVAL = float(os.getenv("BRIEFING_MIN_INTERVAL", "600"))  # <= 6 runs/topic/hour
+BRIEFING_MAX_BACKOFF = float(os.getenv("BRIEFING_MAX_BACKOFF", "3600"))  # Retry interval cap after failures
+BRIEFING_HOT_SECONDS = float(os.getenv("BRIEFING_HOT_SECONDS", "3600"))
+BRIEFING_CHECK_INTERVAL = float(os.getenv("BRIEFING_CHECK_INTERVAL", "30"))
+PROVENANCE_INPUTS = 50  # Input items listed per stored briefing
+
+
+class TopicState:
+    def __init__(self):
+        self.briefing: Optional[dict] = None
+        self.last_seen_id = -1  # Newest live item id the current briefing has seen
+        self.requested_at = 0.0
+        self.runs = deque()  # Generation attempts (ok or not) within the last hour
+        self.last_attempt_at = 0.0
+        self.failures = 0  # Consecutive failed attempts
+        self.running = False
+        self.last_error: Optional[str] = None
+
+    @property
+    def retry_interval(self) -> float:
+        """Minimum gap between attempts: BRIEFING_MIN_INTERVAL, doubled per consecutive failure."""
+        if not self.failures:
+            return BRIEFING_MIN_INTERVAL
+        return min(BRIEFING_MIN_INTERVAL * 2 ** self.failures, BRIEFING_MAX_BACKOFF)
+
+    @property
+    def generated_at(self) -> float:
+        return self.briefing["generated_at"] if self.briefing else 0.0
+
+
+class TopicBriefings:
+    """
+    Background materializer. The app supplies:
+    - match_live(keywords) -> ids of matching live items (cheap, polled)
+    - collect(topic, keywords) -> context items (live + archive, at refresh time)
+    - answer(items, question) -> RAG result dict
+    """
+
+    def __init__(self, match_live: Callable[[List[str]], Set[int]],
+                 collect: Callable[[str, List[str]], list],
+                 answer: Callable[[list, str], Awaitable[dict]],
+                 topics: Dict[str, List[str]] = TOPIC_KEYWORDS):
+        self.match_live = match_live
+        self.collect = collect
+        self.answer = answer
+        self.topics = topics
+        self.state = {topic: TopicState() for topic in topics}
+        self._loaded = False
+
+    def touch(self, topic: str):
+        """Mark a topic as in demand (keeps it materialized)."""
+        if topic in self.state:
+            self.state[topic].requested_at = time.time()
+
+    def get(self, topic: str) -> Optional[dict]:
+        """Latest briefing (with its age), or None if none has been generated yet."""
+        self.touch(topic)
+        briefing = self.state[topic].briefing
+        if briefing is None:
+            return None
+        age = time.time() - briefing["generated_at"]
+        return {**briefing, "age_seconds": round(age, 1), "stale": age > BRIEFING_MAX_AGE}
+
+    def _due(self, topic: str, new_items: int, now: float) -> Optional[str]:
+        state = self.state[topic]
+        if state.running or not new_items:
+            return None
+        if now - state.requested_at > BRIEFING_HOT_SECONDS:
+            return None
+        if now - state.last_attempt_at < state.retry_interval:
+            return None
+        if state.briefing is None:
+            return "initial"
+        if new_items >= BRIEFING_MIN_NEW_ITEMS:
+            return "new_items"
+        if now - state.generated_at >= BRIEFING_MAX_AGE:
+            return "max_age"
+        return None
+
+    async def refresh(self, topic: str, reason: str):
+        state = self.state[topic]
+        keywords = self.topics[topic]
+        state.running = True
+        # Every attempt counts toward the rate limit, including ones that fail
+        state.last_attempt_at = time.time()
+        state.runs.append(state.last_attempt_at)
+        try:
+            live_ids = self.match_live(keywords)
+            items = await asyncio.to_thread(self.collect, topic, keywords)
+            question = f"Latest {topic} news briefing ({', '.join(keywords)})"
+            print(f"📰 Materializing '{topic}' briefing ({reason}, {len(items)} items)")
+            result = await self.answer(items, question)
+            if result.get("error") or not result.get("answer"):
+                raise RuntimeError(result.get("error") or "empty answer")
+
+            now = time.time()
+            briefing = {
+                "topic": topic,
+                "answer": result["answer"],
+                "llm": result.get("llm"),
+                "generated_at": now,
+                "trigger": reason,
+                "provenance": {
+                    "items": len(items),
+                    "live_items": len(live_ids),
+                    "last_live_id": max(live_ids, default=state.last_seen_id),
+                    "newest_item_ts": max((i.get('ts', 0.0) for i in items), default=0.0),
+                    "sources_analyzed": result.get("sources_analyzed"),
+                    "inputs": [
+                        {"source": i.get('source'), "url": i.get('url'),
+                         "reliability": i.get('reliability', 'Unknown'), "ts": i.get('ts', 0.0)}
+                        for i in items[:PROVENANCE_INPUTS]
+                    ],
+                },
+            }
+            await asyncio.to_thread(save_briefing, topic, briefing)
+            state.briefing = briefing
+            state.last_seen_id = briefing["provenance"]["last_live_id"]
+            state.failures = 0
+            state.last_error = None
+        except Exception as e:
+            state.failures += 1
+            state.last_error = str(e)
+            print(f"❌ Briefing '{topic}' failed: {e} (retry in {state.retry_interval:.0f}s)")
+        finally:
+            state.running = False
+
+    async def run(self):
+        """Poll topics forever, regenerating the ones that are due (one at a time)."""
+        if not self._loaded:
+            for topic, briefing in (await asyncio.to_thread(load_briefings)).items():
+                if topic in self.state:
+                    state = self.state[topic]
+                    state.briefing = briefing
+                    state.last_attempt_at = briefing["generated_at"]
+                    # Otherwise every live item counts as new and the topic regenerates at once
+                    state.last_seen_id = briefing.get("provenance", {}).get("last_live_id", -1)
+            self._loaded = True
+            print(f"📰 Topic briefings: {sum(1 for s in self.state.values() if s.briefing)} restored")
+
+        while True:
+            now = time.time()
+            for topic, keywords in self.topics.items():
+                state = self.state[topic]
+                new_items = sum(1 for i in self.match_live(keywords) if i > state.last_seen_id)
+                reason = self._due(topic, new_items, now)
+                if reason:
+                    await self.refresh(topic, reason)
+            await asyncio.sleep(BRIEFING_CHECK_INTERVAL)
+
+    def stats(self) -> dict:
+        cutoff = time.time() - 3600
+        report = {}
+        for topic, state in self.state.items():
+            while state.runs and state.runs[0] < cutoff:
+                state.runs.popleft()
+            report[topic] = {
+                "generated_at": state.generated_at or None,
+                "runs_last_hour": len(state.runs),
+                "hot": time.time() - state.requested_at <= BRIEFING_HOT_SECONDS,
+                "running": state.running,
+                "failures": state.failures,
+                "last_error": state.last_error,
+            }
+        return report
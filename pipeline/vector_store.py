@@ -1,215 +1,489 @@
-# Vector Store for Semantic Search using ChromaDB
+# Vector Store for Semantic Search (NumPy, memory-mapped)
+#
+# Embeddings are L2-normalized float32 rows in a memory-mapped file, so
+# cosine similarity is one matrix-vector product (BLAS) and the index
+# survives restarts. Metadata lives in parallel arrays: publication times
+# in a float64 memmap, strings in an append-only JSONL file. Other processes
+# can open the same directory with read_only=True: they re-read the header
+# before each search, so rows the writer appends show up without a reload.
+#
+# Large archives can use an IVF (inverted file) partition: vectors are
+# clustered with a few rounds of spherical k-means and a query only scores
+# the rows in its `nprobe` closest clusters, plus rows added since the
+# partition was built.
+#
+# With VECTOR_QUANTIZE=int8 the scan runs over int8 codes (one scale per
+# row, ~4x smaller than float32) and only the best candidates are rescored
+# with the full-precision vectors, which then stay on disk / in page cache.
 
+import json
+import os
 import time
+from pathlib import Path
 from typing import List, Dict, Optional
 import threading
 
-try:
-    import chromadb
-    from chromadb.config import Settings
-    # FORCE DISABLE TEMPORARILY TO FIX MUTEX ERROR
-    CHROMA_AVAILABLE = False # True
-except ImportError:
-    CHROMA_AVAILABLE = False
-    print("⚠️ ChromaDB not installed. Vector search disabled.")
+import numpy as np
 
-try:
-    from sentence_transformers import SentenceTransformer
-    EMBEDDINGS_AVAILABLE = True
-except ImportError:
-    EMBEDDINGS_AVAILABLE = False
-    print("⚠️ sentence-transformers not installed. Using fallback search.")
+from pipeline.embedding_worker import get_embedding_worker, EmbeddingUnavailable, EMBEDDINGS_AVAILABLE, EMBEDDING_MODEL
+from pipeline.embedding_cache import content_key
+
+VECTOR_INDEX_DIR = Path(os.getenv("VECTOR_INDEX_DIR", Path(__file__).parent.parent / "data" / "vector_index"))
+# Build an IVF partition once the index holds this many vectors (0 disables IVF)
+VECTOR_IVF_MIN = int(os.getenv("VECTOR_IVF_MIN", "50000"))
+VECTOR_IVF_NPROBE = int(os.getenv("VECTOR_IVF_NPROBE", "8"))
+# "none" (scan float32) or "int8" (scan int8 codes, rescore top candidates in float32)
+VECTOR_QUANTIZE = os.getenv("VECTOR_QUANTIZE", "none").lower()
+VECTOR_RESCORE_FACTOR = int(os.getenv("VECTOR_RESCORE_FACTOR", "4"))
+MIN_RESCORE = 64
+SCAN_CHUNK = 65536
+IVF_MAX_LISTS = 1024
+IVF_TRAIN_ITERS = 10
+IVF_REBUILD_GROWTH = 1.5  # Rebuild when the index has grown this much since the last build
+MIN_CAPACITY = 1024
+TEXT_LIMIT = 500
+
+
+def quantize_int8(vectors: np.ndarray):
+    """Symmetric per-row int8 quantization: (codes, scales) with v ~= codes * scale."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    scales = np.maximum(np.abs(vectors).max(axis=1), 1e-12) / 127.0
+    codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales.astype(np.float32)
 
 
 class VectorStore:
     """
     Lightweight vector store for semantic search on live news data.
-    Uses ChromaDB for storage and sentence-transformers for embeddings.
+    Embeddings come from the out-of-process embedding worker
+    (sentence-transformers never loads in this process).
     """
-    
-    def __init__(self, collection_name: str = "live_news"):
+
+    persistent = True
+
+    def __init__(self, index_dir: Path = VECTOR_INDEX_DIR, read_only: bool = False,
+                 quantize: str = VECTOR_QUANTIZE):
         self._lock = threading.Lock()
         self._item_hashes = set()  # Track unique items
-        
-        if CHROMA_AVAILABLE:
-            # In-memory ChromaDB (no persistence needed for live data)
-            self.client = chromadb.Client(Settings(anonymized_telemetry=False))
-            self.collection = self.client.get_or_create_collection(
-                name=collection_name,
-                metadata={"hnsw:space": "cosine"}
-            )
-            print("✅ ChromaDB initialized (in-memory)")
-        else:
-            self.client = None
-            self.collection = None
-            
-        if EMBEDDINGS_AVAILABLE:
-            # Load lightweight embedding model
-            self.embedder = SentenceTransformer('all-MiniLM-L6-v2')
-            print("✅ Embedding model loaded (all-MiniLM-L6-v2)")
-        else:
-            self.embedder = None
-    
+        self.index_dir = Path(index_dir)
+        self.read_only = read_only
+        self.quantized = quantize == "int8"
+
+        self.dim: Optional[int] = None
+        self._count = 0
+        self._capacity = 0
+        self._vectors: Optional[np.memmap] = None  # (capacity, dim) float32
+        self._ts: Optional[np.memmap] = None  # (capacity,) float64
+        self._codes: Optional[np.memmap] = None  # (capacity, dim) int8, when quantized
+        self._scales: Optional[np.memmap] = None  # (capacity,) float32, when quantized
+        # Parallel metadata arrays (row i describes vector i)
+        self._text: List[str] = []
+        self._source: List[str] = []
+        self._url: List[str] = []
+        self._reliability: List[str] = []
+        self._meta_offset = 0  # Bytes of meta.jsonl read so far
+
+        self._ivf = None  # (centroids, order, offsets, built_count)
+        self._ivf_building = False
+
+        self._load()
+
+        # Embedding worker process (model loads there, in the background).
+        # Readers need it too, to embed the question; only writers add vectors.
+        self.embedder = get_embedding_worker()
+
+    # --- persistence ---
+    @property
+    def _vectors_path(self) -> Path:
+        return self.index_dir / "vectors.f32"
+
+    @property
+    def _ts_path(self) -> Path:
+        return self.index_dir / "ts.f64"
+
+    @property
+    def _codes_path(self) -> Path:
+        return self.index_dir / "codes.i8"
+
+    @property
+    def _scales_path(self) -> Path:
+        return self.index_dir / "scales.f32"
+
+    @property
+    def _meta_path(self) -> Path:
+        return self.index_dir / "meta.jsonl"
+
+    @property
+    def _header_path(self) -> Path:
+        return self.index_dir / "index.json"
+
+    def _load(self):
+        if not self._header_path.exists():
+            print(f"🆕 Vector index will be created at {self.index_dir}")
+            return
+        header = json.loads(self._header_path.read_text())
+        if header.get("model") != EMBEDDING_MODEL:
+            print(f"⚠️ Vector index was built with {header.get('model')}, starting a new one")
+            if not self.read_only:
+                self._archive_old_index()
+            return
+
+        self.dim = header["dim"]
+        self._capacity = header["capacity"]
+        codes_valid = header.get("quantization") == "int8"
+        if self.quantized and not codes_valid:
+            if self.read_only:
+                self.quantized = False  # Writer hasn't built codes yet - scan floats
+            else:
+                self._resize_files(self._capacity)
+        self._map(self._capacity)
+
+        self._read_meta()
+        # Rows are only valid if both the vector and its metadata were written
+        self._count = min(header["count"], len(self._text))
+        if not self.read_only:
+            del self._text[self._count:], self._source[self._count:]
+            del self._url[self._count:], self._reliability[self._count:]
+        self._item_hashes = {self._hash_item({"url": u, "source": s, "text": t})
+                             for u, s, t in zip(self._url, self._source, self._text)}
+        if self.quantized and not codes_valid:
+            for start in range(0, self._count, SCAN_CHUNK):
+                end = min(start + SCAN_CHUNK, self._count)
+                self._codes[start:end], self._scales[start:end] = quantize_int8(self._vectors[start:end])
+            self._codes.flush()
+            self._scales.flush()
+            self._write_header()
+            print(f"🗜️ Quantized {self._count} existing vectors to int8")
+        print(f"✅ Vector index loaded: {self._count} vectors (dim {self.dim}, "
+              f"{'int8 + rescoring' if self.quantized else 'float32'})")
+
+    def _read_meta(self):
+        """Append metadata lines written since the last read (a torn last line is left for later)."""
+        if not self._meta_path.exists():
+            return
+        with open(self._meta_path, "rb") as f:
+            f.seek(self._meta_offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    meta = json.loads(line)
+                except ValueError:
+                    break
+                self._append_meta(meta)
+                self._meta_offset += len(line)
+
+    def _refresh(self):
+        """Read-only: pick up rows the writer appended since the last look (remapping if it grew)."""
+        if not self.read_only:
+            return
+        try:
+            header = json.loads(self._header_path.read_text())
+        except (OSError, ValueError):
+            return  # Not created yet
+        if header.get("model") != EMBEDDING_MODEL or header["count"] <= self._count:
+            return
+        with self._lock:
+            self.dim = header["dim"]
+            if self.quantized and header.get("quantization") != "int8":
+                self.quantized = False
+            if header["capacity"] != self._capacity:
+                self._map(header["capacity"])
+                self._capacity = header["capacity"]
+            self._read_meta()
+            self._count = min(header["count"], len(self._text))
+
+    def _archive_old_index(self):
+        stamp = int(time.time())
+        for path in (self._vectors_path, self._ts_path, self._codes_path, self._scales_path,
+                     self._meta_path, self._header_path):
+            if path.exists():
+                path.rename(path.with_name(f"{path.name}.{stamp}.old"))
+
+    def _map(self, capacity: int):
+        mode = "r" if self.read_only else "r+"
+        self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode=mode, shape=(capacity, self.dim))
+        self._ts = np.memmap(self._ts_path, dtype=np.float64, mode=mode, shape=(capacity,))
+        if self.quantized:
+            self._codes = np.memmap(self._codes_path, dtype=np.int8, mode=mode, shape=(capacity, self.dim))
+            self._scales = np.memmap(self._scales_path, dtype=np.float32, mode=mode, shape=(capacity,))
+
+    def _resize_files(self, capacity: int):
+        files = [(self._vectors_path, self.dim * 4), (self._ts_path, 8)]
+        if self.quantized:
+            files += [(self._codes_path, self.dim), (self._scales_path, 4)]
+        for path, width in files:
+            with open(path, "ab") as f:
+                f.truncate(capacity * width)
+
+    def _grow(self, needed: int):
+        """Resize the backing files (caller holds _lock)."""
+        capacity = max(MIN_CAPACITY, self._capacity)
+        while capacity < needed:
+            capacity *= 2
+        if capacity == self._capacity:
+            return
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        self._resize_files(capacity)
+        # Readers holding the old maps keep a valid view of the first _count rows
+        self._map(capacity)
+        self._capacity = capacity
+        self._write_header()
+
+    def _write_header(self):
+        tmp = self._header_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({
+            "model": EMBEDDING_MODEL, "dim": self.dim,
+            "count": self._count, "capacity": self._capacity,
+            "quantization": "int8" if self.quantized else None
+        }))
+        os.replace(tmp, self._header_path)
+
+    def _append_meta(self, meta: Dict):
+        self._text.append(meta.get("text", ""))
+        self._source.append(meta.get("source", "unknown"))
+        self._url.append(meta.get("url", ""))
+        self._reliability.append(meta.get("reliability", "Unknown"))
+
+    # --- indexing ---
     def _hash_item(self, item: Dict) -> str:
-        """Create unique hash for an item."""
-        return f"{item.get('source', '')}_{item.get('text', '')[:50]}_{item.get('url', '')}"
-    
+        """
+        Stable identity for an item. Keyed on URL when there is one, so the
+        live copy and its archived (source + "_db") copy are indexed once;
+        otherwise on a content hash of the text (same across processes).
+        """
+        url = item.get('url', '')
+        if url:
+            return url
+        return content_key(item.get('text', '')[:TEXT_LIMIT], EMBEDDING_MODEL).hex()
+
+    def ready(self) -> bool:
+        """True when embeddings can be computed right now."""
+        return self.embedder is not None and self.embedder.is_ready()
+
     def add_items(self, items: List[Dict]) -> int:
         """
         Add items to the vector store.
-        Returns number of new items added.
+        Returns number of new items added. Raises EmbeddingUnavailable if the
+        batch could not be embedded - nothing from it is stored then.
         """
-        if not CHROMA_AVAILABLE or not EMBEDDINGS_AVAILABLE:
+        if self.read_only or self.embedder is None:
             return 0
-            
+
         new_items = []
+        seen = set()
         with self._lock:
             for item in items:
                 item_hash = self._hash_item(item)
-                if item_hash not in self._item_hashes:
-                    self._item_hashes.add(item_hash)
+                if item_hash not in self._item_hashes and item_hash not in seen:
+                    seen.add(item_hash)
                     new_items.append(item)
-        
+
         if not new_items:
             return 0
-            
-        # Prepare data for ChromaDB
-        ids = [f"item_{hash(self._hash_item(item)) % 10**9}" for item in new_items]
-        documents = [item.get('text', '')[:500] for item in new_items]  # Limit text length
-        metadatas = []
-        
-        for item in new_items:
-            # Parse created_utc - handle both ISO strings and Unix timestamps
-            created = item.get('created_utc', 0)
-            if isinstance(created, str):
-                try:
-                    # ISO format: 2026-01-10T07:57:09Z
-                    from datetime import datetime
-                    dt = datetime.fromisoformat(created.replace('Z', '+00:00'))
-                    created = dt.timestamp()
-                except:
-                    created = time.time()
-            else:
-                try:
-                    created = float(created)
-                except:
-                    created = time.time()
-            
-            metadatas.append({
-                "source": item.get('source', 'unknown'),
-                "url": item.get('url', ''),
-                "created_utc": created,
-                "reliability": item.get('reliability', 'Unknown')
-            })
-        
-        # Generate embeddings
-        embeddings = self.embedder.encode(documents).tolist()
-        
-        # Add to collection
-        # Add to collection
+
+        documents = [item.get('text', '')[:TEXT_LIMIT] for item in new_items]
+
+        # Generate embeddings (in the worker process); on failure nothing is marked as seen
+        embeddings = self.embedder.encode(documents)
+
+        with self._lock:
+            # Another thread may have added some of these while we were encoding
+            rows = [i for i, item in enumerate(new_items) if self._hash_item(item) not in self._item_hashes]
+            if not rows:
+                return 0
+            if self.dim is None:
+                self.dim = embeddings.shape[1]
+
+            start = self._count
+            end = start + len(rows)
+            self._grow(end)
+            self._vectors[start:end] = embeddings[rows]
+            self._ts[start:end] = [new_items[i].get('ts') or time.time() for i in rows]
+            self._vectors.flush()
+            self._ts.flush()
+            if self.quantized:
+                self._codes[start:end], self._scales[start:end] = quantize_int8(embeddings[rows])
+                self._codes.flush()
+                self._scales.flush()
+
+            with open(self._meta_path, "a", encoding="utf-8") as f:
+                for i in rows:
+                    item = new_items[i]
+                    meta = {
+                        "text": documents[i],
+                        "source": item.get('source', 'unknown'),
+                        "url": item.get('url', ''),
+                        "reliability": item.get('reliability', 'Unknown')
+                    }
+                    f.write(json.dumps(meta) + "\n")
+                    self._append_meta(meta)
+                    self._item_hashes.add(self._hash_item(item))
+
+            self._count = end
+            self._write_header()
+            rebuild_ivf = self._ivf_due()
+
+        if rebuild_ivf:
+            threading.Thread(target=self._build_ivf, daemon=True, name="ivf-build").start()
+        return len(rows)
+
+    # --- IVF partition ---
+    def _ivf_due(self) -> bool:
+        """Whether a (re)build should start (caller holds _lock)."""
+        if not VECTOR_IVF_MIN or self._count < VECTOR_IVF_MIN or self._ivf_building:
+            return False
+        if self._ivf is not None and self._count < self._ivf[3] * IVF_REBUILD_GROWTH:
+            return False
+        self._ivf_building = True
+        return True
+
+    def _build_ivf(self):
         try:
-            with self._lock:  # CRITICAL: Lock during write to prevent mutex errors
-                self.collection.add(
-                    ids=ids,
-                    embeddings=embeddings,
-                    documents=documents,
-                    metadatas=metadatas
-                )
+            with self._lock:
+                n, vectors = self._count, self._vectors
+            data = vectors[:n]
+            nlist = max(1, min(IVF_MAX_LISTS, int(np.sqrt(n))))
+            rng = np.random.default_rng(0)
+
+            # Spherical k-means on a sample
+            sample = np.asarray(data[np.sort(rng.choice(n, min(n, nlist * 40), replace=False))])
+            centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+            for _ in range(IVF_TRAIN_ITERS):
+                assign = np.argmax(sample @ centroids.T, axis=1)
+                for c in range(nlist):
+                    members = sample[assign == c]
+                    if len(members):
+                        centroids[c] = members.sum(axis=0)
+                norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+                centroids /= np.maximum(norms, 1e-12)
+
+            # Assign every vector, then group row ids by list
+            assign = np.concatenate([
+                np.argmax(data[i:i + 65536] @ centroids.T, axis=1) for i in range(0, n, 65536)
+            ])
+            order = np.argsort(assign, kind="stable")
+            offsets = np.searchsorted(assign[order], np.arange(nlist + 1))
+            with self._lock:
+                self._ivf = (centroids, order, offsets, n)
+            print(f"🗂️ IVF index built: {nlist} lists over {n} vectors")
         except Exception as e:
-            # Handle duplicate ID errors gracefully
-            print(f"⚠️ Vector add error: {e}")
-            pass
-            
-        return len(new_items)
-    
+            print(f"❌ IVF build failed: {e}")
+        finally:
+            self._ivf_building = False
+
+    def _candidates(self, q: np.ndarray, n: int, ivf) -> Optional[np.ndarray]:
+        """Row ids to score for query q, or None to scan everything."""
+        if ivf is None:
+            return None
+        centroids, order, offsets, built = ivf
+        probe = np.argsort(centroids @ q)[::-1][:VECTOR_IVF_NPROBE]
+        parts = [order[offsets[c]:offsets[c + 1]] for c in probe]
+        parts.append(np.arange(built, n))  # Rows added since the build
+        return np.concatenate(parts)
+
+    # --- retrieval ---
+    def _row(self, i: int) -> Dict:
+        return {
+            'text': self._text[i],
+            'source': self._source[i],
+            'url': self._url[i],
+            'created_utc': float(self._ts[i]),
+            'ts': float(self._ts[i]),
+            'reliability': self._reliability[i]
+        }
+
     def search(self, query: str, n_results: int = 20) -> List[Dict]:
         """
         Search for semantically similar items - NO TIME LIMIT for true real-time RAG.
         Searches ALL indexed content.
-        
+
         Args:
             query: Search query
             n_results: Max number of results
-            
+
         Returns:
             List of matching items with scores
         """
-        if not CHROMA_AVAILABLE or not EMBEDDINGS_AVAILABLE:
+        self._refresh()
+        if self.embedder is None or self._count == 0:
             return []
-            
-        if self.collection.count() == 0:
-            return []
-            
+
         # Generate query embedding
-        query_embedding = self.embedder.encode([query]).tolist()[0]
-        
-        # Search ALL content - NO TIME FILTER
         try:
-            results = self.collection.query(
-                query_embeddings=[query_embedding],
-                n_results=min(n_results, self.collection.count())
-            )
-        except Exception as e:
-            print(f"Vector search error: {e}")
+            q = self.embedder.encode([query], priority=True)[0]
+        except EmbeddingUnavailable as e:
+            print(f"⚠️ Embeddings unavailable, skipping vector search: {e}")
+            return []
+        return self.search_vector(q, n_results)
+
+    def _scan(self, q: np.ndarray, n: int, candidates: Optional[np.ndarray], codes, scales, vectors) -> np.ndarray:
+        """Approximate (int8) or exact (float32) scores for all rows or the candidate rows."""
+        if not self.quantized:
+            return vectors[:n] @ q if candidates is None else vectors[candidates] @ q
+        if candidates is not None:
+            return (codes[candidates].astype(np.float32) @ q) * scales[candidates]
+        # Chunked so only one slice of codes is widened to float at a time
+        return np.concatenate([
+            (codes[i:min(i + SCAN_CHUNK, n)].astype(np.float32) @ q) * scales[i:min(i + SCAN_CHUNK, n)]
+            for i in range(0, n, SCAN_CHUNK)
+        ])
+
+    def search_vector(self, q: np.ndarray, n_results: int = 20) -> List[Dict]:
+        """Top-n rows by cosine similarity to an already-normalized query vector."""
+        self._refresh()
+        with self._lock:
+            n, vectors, ivf = self._count, self._vectors, self._ivf
+            codes, scales = self._codes, self._scales
+        if n == 0:
             return []
-        
-        # Format results
+
+        candidates = self._candidates(q, n, ivf)
+        scores = self._scan(q, n, candidates, codes, scales, vectors)
+        rows = candidates if candidates is not None else np.arange(n)
+
+        # Quantized: shortlist more than asked for, then rescore in full precision
+        k = min(n_results, len(scores))
+        shortlist = min(len(scores), max(k * VECTOR_RESCORE_FACTOR, MIN_RESCORE)) if self.quantized else k
+        top = np.argpartition(-scores, shortlist - 1)[:shortlist]
+        rows, scores = rows[top], scores[top]
+        if self.quantized:
+            order = np.argsort(rows)  # Sequential disk reads
+            rows = rows[order]
+            scores = vectors[rows] @ q
+        best = np.argsort(-scores)[:k]
+
         items = []
-        if results and results['documents'] and results['documents'][0]:
-            for i, doc in enumerate(results['documents'][0][:n_results]):
-                meta = results['metadatas'][0][i] if results['metadatas'] else {}
-                distance = results['distances'][0][i] if results['distances'] else 0
-                items.append({
-                    'text': doc,
-                    'source': meta.get('source', 'unknown'),
-                    'url': meta.get('url', ''),
-                    'created_utc': meta.get('created_utc', 0),
-                    'reliability': meta.get('reliability', 'Unknown'),
-                    'similarity_score': 1 - distance  # Convert distance to similarity
-                })
-                
+        for j in best:
+            item = self._row(int(rows[j]))
+            item['similarity_score'] = float(scores[j])
+            items.append(item)
         return items
-    
+
     def get_fresh_items(self, max_age_seconds: int = 300) -> List[Dict]:
         """Get all items newer than max_age_seconds."""
-        if not CHROMA_AVAILABLE:
+        with self._lock:
+            n, ts = self._count, self._ts
+        if n == 0:
             return []
-            
         cutoff_time = time.time() - max_age_seconds
-        
-        try:
-            results = self.collection.get(
-                where={"created_utc": {"$gte": cutoff_time}}
-            )
-            
-            items = []
-            if results and results['documents']:
-                for i, doc in enumerate(results['documents']):
-                    meta = results['metadatas'][i] if results['metadatas'] else {}
-                    items.append({
-                        'text': doc,
-                        'source': meta.get('source', 'unknown'),
-                        'url': meta.get('url', ''),
-                        'created_utc': meta.get('created_utc', 0),
-                        'reliability': meta.get('reliability', 'Unknown')
-                    })
-            return items
-        except Exception:
-            return []
-    
+        return [self._row(int(i)) for i in np.flatnonzero(ts[:n] >= cutoff_time)]
+
     def count(self) -> int:
         """Return total items in store."""
-        if self.collection:
-            return self.collection.count()
-        return 0
+        return self._count
 
 
 # Global instance
 _vector_store: Optional[VectorStore] = None
+_vector_store_lock = threading.Lock()
 
-def get_vector_store() -> VectorStore:
-    """Get or create the global vector store instance."""
+def get_vector_store() -> Optional[VectorStore]:
+    """Get or create the global vector store instance (None if unavailable)."""
     global _vector_store
-    if _vector_store is None:
-        _vector_store = VectorStore()
+    if not EMBEDDINGS_AVAILABLE:
+        return None
+    with _vector_store_lock:
+        if _vector_store is None:
+            _vector_store = VectorStore()
     return _vector_store
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+OFFLINE /query BENCHMARK - drives query_endpoint in-process with a replayed LLM
+
+The live window is loaded from a recorded snapshot, the archive from a
+fixture (into a throwaway SQLite DB), and the LLM is the ReplayProvider
+(recorded answers, seeded latency distribution). The web fallback and the
+answer cache are off, so every request exercises retrieval + packing + LLM.
+Reports per-stage latency percentiles and throughput.
+
+  # 1. Record inputs from a running server (with LLM_RECORD_FILE=replay.jsonl set there)
+  python scripts/benchmark_query.py --capture http://localhost:8000 --snapshot live.jsonl
+
+  # 2. Benchmark offline
+  python scripts/benchmark_query.py --snapshot live.jsonl --archive archive.jsonl \\
+      --recordings replay.jsonl -n 200 -c 16
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+DEFAULT_QUERIES = [
+    "AI regulation", "stock market", "election results", "climate change",
+    "SpaceX launch", "interest rates", "cyber attack", "championship final",
+]
+
+
+def read_jsonl(path: str) -> list:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def capture_snapshot(base_url: str, path: str):
+    """Save the live items a running server currently serves on /data."""
+    import httpx
+    data = httpx.get(f"{base_url.rstrip('/')}/data", timeout=30).json()
+    items = [item for key, values in data.items() if key != "stats" for item in values]
+    with open(path, "w", encoding="utf-8") as f:
+        for item in items:
+            f.write(json.dumps(item) + "\n")
+    print(f"💾 Captured {len(items)} live items to {path}")
+
+
+def configure_environment(args, workdir: str):
+    """Everything read at import time has to be set before the app is imported."""
+    os.environ["NEWS_DB_PATH"] = str(Path(workdir) / "bench_archive.db")
+    os.environ.setdefault("VECTOR_INDEX_DIR", str(Path(workdir) / "vector_index"))
+    os.environ.setdefault("EMBED_CACHE_DIR", str(Path(workdir) / "embedding_cache"))
+    os.environ["QUERY_WEB_FALLBACK"] = "0"
+    if not args.cache:
+        os.environ["ANSWER_CACHE_TTL"] = "0"
+    os.environ["LLM_PROVIDER"] = "replay"
+    os.environ["LLM_REPLAY_FILE"] = args.recordings or ""
+    os.environ["LLM_REPLAY_LATENCY"] = args.latency
+    os.environ["LLM_REPLAY_P50_MS"] = str(args.p50_ms)
+    os.environ["LLM_REPLAY_P95_MS"] = str(args.p95_ms)
+    os.environ["LLM_REPLAY_ERROR_RATE"] = str(args.error_rate)
+    os.environ["LLM_REPLAY_SEED"] = str(args.seed)
+
+
+def load_fixtures(ap, args) -> int:
+    from ingest.article import Article
+    from data.database import save_articles_batch
+
+    if args.archive:
+        archived = [a for a in (Article.from_raw(r) for r in read_jsonl(args.archive)) if a]
+        print(f"🗄️ Archive fixture: {save_articles_batch(archived)} items")
+
+    live = 0
+    if args.snapshot:
+        with ap.data_lock:
+            for raw in read_jsonl(args.snapshot):
+                item = Article.from_raw(raw)
+                if item:
+                    ap.data_store["items"].append(item)
+                    live += 1
+    print(f"📡 Live snapshot: {live} items")
+    return live
+
+
+def pick_queries(args) -> list:
+    if args.queries:
+        with open(args.queries, encoding="utf-8") as f:
+            queries = [line.strip() for line in f if line.strip()]
+    elif args.recordings:
+        queries = [r["question"] for r in read_jsonl(args.recordings) if r.get("question")]
+    else:
+        queries = []
+    return queries or DEFAULT_QUERIES
+
+
+async def run_benchmark(ap, queries: list, total: int, concurrency: int, clients: int):
+    import httpx
+    from pipeline.timing import LatencyStats
+
+    stats = LatencyStats(window=max(total, 1))
+    statuses = {}
+    errors = 0
+    coalesced = 0
+    next_request = 0
+
+    transport = httpx.ASGITransport(app=ap.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        async def worker(worker_id: int):
+            nonlocal next_request, errors, coalesced
+            while next_request < total:
+                n = next_request
+                next_request += 1
+                started = time.perf_counter()
+                resp = await client.post(
+                    "/query", json={"query": queries[n % len(queries)], "fast": True},
+                    headers={"X-Forwarded-For": f"bench-{n % clients}"}
+                )
+                statuses[resp.status_code] = statuses.get(resp.status_code, 0) + 1
+                if resp.status_code != 200:
+                    continue
+                body = resp.json()
+                if body.get("error"):
+                    errors += 1
+                if body.get("coalesced"):
+                    coalesced += 1  # Shared another request's pipeline run (single-flight)
+                timings = dict(body.get("timings", {}))
+                timings["client_observed"] = round((time.perf_counter() - started) * 1000, 1)
+                stats.record(timings)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(i) for i in range(concurrency)))
+        wall = time.perf_counter() - started
+
+    return stats.snapshot(), statuses, errors, coalesced, wall
+
+
+def print_report(report: dict, statuses: dict, errors: int, coalesced: int, wall: float, total: int):
+    print("\n" + "=" * 72)
+    print(f"{'stage':<18}{'count':>7}{'p50':>10}{'p90':>10}{'p95':>10}{'p99':>10}{'max':>10}")
+    print("-" * 72)
+    for stage, s in sorted(report.items(), key=lambda kv: (kv[0] in ("total", "client_observed"), kv[0])):
+        print(f"{stage:<18}{s['count']:>7}{s['p50']:>10.1f}{s['p90']:>10.1f}"
+              f"{s['p95']:>10.1f}{s['p99']:>10.1f}{s['max']:>10.1f}")
+    print("-" * 72)
+    print(f"Requests: {total} in {wall:.2f}s -> {total / wall:.1f} req/s  (latencies in ms)")
+    print(f"Status codes: {statuses} | LLM errors: {errors} | Coalesced: {coalesced}")
+    print("=" * 72)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline /query latency + throughput benchmark")
+    parser.add_argument("--snapshot", help="Live items, JSONL of connector dicts")
+    parser.add_argument("--archive", help="Archive fixture, JSONL of connector dicts")
+    parser.add_argument("--recordings", help="Recorded LLM answers (LLM_RECORD_FILE output)")
+    parser.add_argument("--queries", help="Questions, one per line (default: recorded questions)")
+    parser.add_argument("--capture", metavar="URL", help="Record --snapshot from a running server and exit")
+    parser.add_argument("-n", "--requests", type=int, default=100)
+    parser.add_argument("-c", "--concurrency", type=int, default=8)
+    parser.add_argument("--clients", type=int, default=8, help="Distinct client ids (scheduler fairness)")
+    parser.add_argument("--latency", choices=["fixed", "lognormal", "recorded"], default="lognormal")
+    parser.add_argument("--p50-ms", type=float, default=900)
+    parser.add_argument("--p95-ms", type=float, default=2500)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--cache", action="store_true", help="Keep the answer cache on")
+    parser.add_argument("--json", metavar="FILE", help="Also write the report as JSON")
+    args = parser.parse_args()
+
+    if args.capture:
+        if not args.snapshot:
+            parser.error("--capture needs --snapshot")
+        capture_snapshot(args.capture, args.snapshot)
+        return
+
+    with tempfile.TemporaryDirectory(prefix="bench_query_") as workdir:
+        configure_environment(args, workdir)
+        import app_pathway as ap
+
+        load_fixtures(ap, args)
+        queries = pick_queries(args)
+        print(f"🏁 {args.requests} requests, concurrency {args.concurrency}, {len(queries)} distinct questions")
+        report, statuses, errors, coalesced, wall = asyncio.run(
+            run_benchmark(ap, queries, args.requests, args.concurrency, args.clients)
+        )
+        print_report(report, statuses, errors, coalesced, wall, args.requests)
+
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump({
+                    "stages": report,
+                    "statuses": statuses,
+                    "llm_errors": errors,
+                    "coalesced": coalesced,
+                    "wall_seconds": wall,
+                    "requests": args.requests,
+                    "throughput_rps": args.requests / wall,
+                }, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
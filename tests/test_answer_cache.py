@@ -0,0 +1,7 @@
+from pipeline.answer_cache import normalize_query
+
+
+def test_question_phrasings_share_a_cache_key():
+    assert normalize_query("What's happening with AI regulation?") == "ai regulation"
+    assert normalize_query("ai regulation") == "ai regulation"
+    assert normalize_query("Regulation of AI?") == normalize_query("AI  regulation")
@@ -0,0 +1,18 @@
+from ingest.article import Article, tokenize
+from pipeline.live_index import LiveIndex, query_terms
+
+
+def test_apostrophes_do_not_produce_single_letter_terms():
+    assert query_terms("What's happening with AI regulation?") == ["ai", "regulation"]
+    assert tokenize("Google's new phone") == ["google", "new", "phone"]
+    assert tokenize("Google’s new phone") == ["google", "new", "phone"]
+
+
+def test_possessives_do_not_match_unrelated_questions():
+    index = LiveIndex()
+    index.append(Article("Google's new phone launches", "opml", "https://a/1"))
+    index.append(Article("EU passes AI regulation", "opml", "https://a/2"))
+
+    matches = index.search(query_terms("What's happening with AI regulation?"))
+    assert [item.url for item in matches] == ["https://a/2"]
+    assert [item.url for item in index.search(query_terms("google"))] == ["https://a/1"]
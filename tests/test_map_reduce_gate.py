@@ -0,0 +1,57 @@
+import asyncio
+import json
+import time
+
+import data.database as database
+import pipeline.gemini_rag as gemini_rag
+from ingest.article import Article
+from pipeline.llm_providers import FunctionProvider, configured_providers, set_providers
+
+QUESTION = "What is the latest on the bank market?"
+
+
+def run_query(monkeypatch, tmp_path, texts):
+    monkeypatch.setattr(database, "DB_PATH", tmp_path / "archive.db")
+    monkeypatch.setattr(gemini_rag, "get_vector_store", lambda: None)
+    database.init_db()
+    now = time.time()
+    database.save_articles_batch([
+        Article(text, "gnews", f"https://example.com/{i}", now - i * 60, "High")
+        for i, text in enumerate(texts)
+    ])
+
+    calls = []
+
+    async def answer(system_prompt, user_prompt):
+        calls.append(system_prompt)
+        if system_prompt is gemini_rag.MAP_PROMPT:
+            return {"answer": "- fact (Example | High | https://example.com/0)", "llm": "fake"}
+        return {"answer": json.dumps({"summary": "ok"}), "llm": "fake"}
+
+    previous = configured_providers()
+    set_providers([FunctionProvider("fake", answer)])
+    try:
+        result = asyncio.run(gemini_rag.pathway_rag_query([], QUESTION))
+    finally:
+        set_providers(previous)
+    return result, calls
+
+
+def test_or_matches_alone_take_the_single_call_path(monkeypatch, tmp_path):
+    # 300 archived rows that each mention only one of the query terms
+    texts = [f"Story {i}: {'central bank' if i % 2 else 'housing market'} item{i} detail{i} region{i}"
+             for i in range(300)]
+    result, calls = run_query(monkeypatch, tmp_path, texts)
+
+    assert len(calls) == 1
+    assert "map_reduce" not in result["sources_analyzed"]
+    assert result["sources_analyzed"]["relevant"] == 0
+
+
+def test_many_relevant_stories_still_map_reduce(monkeypatch, tmp_path):
+    texts = [f"Bank market story {i}: item{i} detail{i} region{i} sector{i} figure{i} outlook{i}"
+             for i in range(300)]
+    result, calls = run_query(monkeypatch, tmp_path, texts)
+
+    assert len(calls) > 1
+    assert calls.count(gemini_rag.MAP_PROMPT) == len(calls) - 1
@@ -0,0 +1,25 @@
+import asyncio
+import time
+
+import ingest.on_demand as on_demand
+
+
+def test_source_slower_than_the_deadline_still_warms_the_cache(monkeypatch):
+    calls = []
+
+    def slow_source(query, timeout):
+        calls.append(timeout)
+        time.sleep(0.3)
+        return [f"article about {query}"]
+
+    monkeypatch.setattr(on_demand, "ON_DEMAND_SOURCES", {"slow": slow_source})
+    monkeypatch.setattr(on_demand, "ON_DEMAND_SOURCE_TIMEOUTS", {"slow": 45.0})
+    monkeypatch.setattr(on_demand, "on_demand_cache", on_demand.OnDemandCache())
+
+    assert asyncio.run(on_demand.fetch_on_demand("slow source check", deadline=0.05)) == []
+    # A repeat while the first fetch is running joins it instead of calling again
+    assert asyncio.run(on_demand.fetch_on_demand("slow source check", deadline=0.05)) == []
+    time.sleep(0.4)
+
+    assert asyncio.run(on_demand.fetch_on_demand("slow source check", deadline=0.05)) == ["article about slow source check"]
+    assert calls == [45.0]
@@ -0,0 +1,79 @@
+import asyncio
+
+from fastapi import HTTPException
+
+import app_pathway
+from pipeline.scheduler import QueryScheduler, SchedulerBusy
+
+
+class FakeClient:
+    def __init__(self, host):
+        self.host = host
+
+
+class FakeRequest:
+    def __init__(self, host):
+        self.headers = {}
+        self.client = FakeClient(host)
+
+    async def is_disconnected(self):
+        return False
+
+
+class ShedsLeader(QueryScheduler):
+    """Admits everyone except `leader`, whose queue wait times out."""
+
+    async def acquire(self, client):
+        if client == "leader":
+            await asyncio.sleep(0.1)
+            raise SchedulerBusy("timed out waiting for a query slot", 1)
+        await super().acquire(client)
+
+
+def test_shed_leader_does_not_fail_attached_clients(monkeypatch):
+    runs = []
+
+    async def gather(req, timer):
+        return [], [], {}, frozenset()
+
+    async def answer(context, question, timer, archive):
+        runs.append(question)
+        return {"answer": "ok"}
+
+    monkeypatch.setattr(app_pathway, "query_scheduler", ShedsLeader())
+    monkeypatch.setattr(app_pathway, "gather_query_context", gather)
+    monkeypatch.setattr(app_pathway, "pathway_rag_query", answer)
+    req = app_pathway.QueryRequest(query="shed leader coalescing check")
+
+    async def both():
+        leader = asyncio.ensure_future(app_pathway.query_endpoint(req, FakeRequest("leader")))
+        await asyncio.sleep(0.01)
+        follower = asyncio.ensure_future(app_pathway.query_endpoint(req, FakeRequest("follower")))
+        return await asyncio.gather(leader, follower, return_exceptions=True)
+
+    leader_result, follower_result = asyncio.run(both())
+    assert isinstance(leader_result, HTTPException) and leader_result.status_code == 503
+    assert follower_result["answer"] == "ok"
+    assert len(runs) == 1
+
+
+def test_cache_hits_count_toward_total_latency(monkeypatch):
+    from pipeline.timing import LatencyStats
+
+    async def gather(req, timer):
+        return [], [], {}, frozenset()
+
+    async def answer(context, question, timer, archive):
+        return {"answer": "ok"}
+
+    monkeypatch.setattr(app_pathway, "query_latency", LatencyStats())
+    monkeypatch.setattr(app_pathway, "gather_query_context", gather)
+    monkeypatch.setattr(app_pathway, "pathway_rag_query", answer)
+    req = app_pathway.QueryRequest(query="cache hit latency check")
+
+    asyncio.run(app_pathway.query_endpoint(req, FakeRequest("client")))
+    hit = asyncio.run(app_pathway.query_endpoint(req, FakeRequest("client")))
+
+    stages = app_pathway.query_latency.snapshot()
+    assert "cache_hit" in hit["timings"]
+    assert stages["total"]["count"] == 2
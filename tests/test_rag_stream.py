@@ -0,0 +1,85 @@
+import asyncio
+import json
+import time
+
+import data.database as database
+import pipeline.gemini_rag as gemini_rag
+import pipeline.llm_providers as llm_providers
+from ingest.article import Article
+from pipeline.llm_providers import FunctionProvider, set_providers
+
+QUESTION = "What is the latest on the bank market?"
+NO_DATA = json.dumps({"summary": "Current live streams do not contain data on this specific topic."})
+ANSWER = json.dumps({"summary": "Banks rallied as the market priced in rate cuts.", "findings": []})
+
+
+def stream_events(monkeypatch, tmp_path, archived, live, respond):
+    """Run pathway_rag_stream with `respond(system_prompt, user_prompt) -> text` as the only provider."""
+    monkeypatch.setattr(database, "DB_PATH", tmp_path / "archive.db")
+    monkeypatch.setattr(gemini_rag, "get_vector_store", lambda: None)
+    database.init_db()
+    now = time.time()
+    database.save_articles_batch([
+        Article(text, "gnews", f"https://example.com/{i}", now - i * 60, "High")
+        for i, text in enumerate(archived)
+    ])
+
+    prompts = []
+
+    async def query(system_prompt, user_prompt):
+        prompts.append(user_prompt)
+        return {"answer": respond(system_prompt, user_prompt), "llm": "fake"}
+
+    async def stream(system_prompt, user_prompt):
+        prompts.append(user_prompt)
+        text = respond(system_prompt, user_prompt)
+        for start in range(0, len(text), 16):
+            yield text[start:start + 16]
+
+    async def collect():
+        return [event async for event in gemini_rag.pathway_rag_stream(live, QUESTION)]
+
+    previous = list(llm_providers._providers)
+    set_providers([FunctionProvider("fake", query, stream)])
+    try:
+        return asyncio.run(collect()), prompts
+    finally:
+        set_providers(previous)
+
+
+def test_stream_map_reduces_large_result_sets(monkeypatch, tmp_path):
+    archived = [f"Bank market story {i}: item{i} detail{i} region{i} sector{i} figure{i} outlook{i}"
+                for i in range(300)]
+
+    def respond(system_prompt, user_prompt):
+        if system_prompt is gemini_rag.MAP_PROMPT:
+            return "- fact (Example | High | https://example.com/0)"
+        return ANSWER
+
+    events, prompts = stream_events(monkeypatch, tmp_path, archived, [], respond)
+
+    final = events[-1][1]
+    assert final["answer"] == ANSWER
+    assert final["sources_analyzed"]["map_reduce"]["shards"] > 1
+    assert "SHARD SUMMARIES" in prompts[-1]
+    assert "".join(payload["text"] for event, payload in events if event == "token") == ANSWER
+
+
+def test_stream_geometric_retries_deeper_before_sending_tokens(monkeypatch, tmp_path):
+    monkeypatch.setattr(gemini_rag, "RAG_MODE", "geometric")
+    live = [Article(f"Bank market update {i}: lender{i} shares{i} index{i}", "opml",
+                    f"https://live.example.com/{i}", time.time() - i, "High")
+            for i in range(12)]
+
+    def respond(system_prompt, user_prompt):
+        stories = user_prompt.count("[Source: ")
+        return NO_DATA if stories <= gemini_rag.GEOMETRIC_START_STORIES else ANSWER
+
+    events, prompts = stream_events(monkeypatch, tmp_path, [], live, respond)
+
+    tokens = "".join(payload["text"] for event, payload in events if event == "token")
+    final = events[-1][1]
+    assert tokens == ANSWER
+    assert final["answer"] == ANSWER
+    assert len(final["sources_analyzed"]["rag_rounds"]) == 2
+    assert len(prompts) == 2
@@ -0,0 +1,21 @@
+from pipeline.story_clusters import cluster_stories
+
+
+def test_same_story_from_several_outlets_is_one_cluster():
+    headline = "Federal Reserve raises interest rates by quarter point amid inflation worries"
+    items = [{"text": headline + suffix} for suffix in ("", " today", " analysts say")]
+    items.append({"text": "SpaceX Starship completes orbital test flight over Pacific ocean"})
+
+    assert [len(cluster) for cluster in cluster_stories(items)] == [3, 1]
+
+
+def test_overlapping_templates_do_not_chain_into_one_story():
+    # Each item shares 9 of 10 words with its neighbour but nothing with items 10 away
+    words = [f"word{k}" for k in range(60)]
+    items = [{"text": " ".join(words[k:k + 10])} for k in range(30)]
+
+    clusters = cluster_stories(items)
+    assert len(clusters) > 1
+    for cluster in clusters:
+        first = int(cluster[0]["text"].split()[0][4:])
+        assert all(int(item["text"].split()[0][4:]) - first < 10 for item in cluster)
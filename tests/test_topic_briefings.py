@@ -0,0 +1,33 @@
+import asyncio
+
+import data.database as database
+import pipeline.topic_briefings as topic_briefings
+
+
+def test_failing_topic_is_not_retried_every_poll(monkeypatch, tmp_path):
+    monkeypatch.setattr(database, "DB_PATH", tmp_path / "archive.db")
+    monkeypatch.setattr(topic_briefings, "BRIEFING_CHECK_INTERVAL", 0.01)
+    database.init_db()
+
+    calls = []
+
+    async def failing_answer(items, question):
+        calls.append(question)
+        return {"error": "provider down", "answer": None}
+
+    briefings = topic_briefings.TopicBriefings(lambda keywords: {1, 2}, lambda topic, keywords: [],
+                                               failing_answer, topics={"technology": ["ai"]})
+    briefings.touch("technology")
+
+    async def run_briefly():
+        task = asyncio.ensure_future(briefings.run())
+        await asyncio.sleep(0.3)
+        task.cancel()
+
+    asyncio.run(run_briefly())
+
+    stats = briefings.stats()["technology"]
+    assert len(calls) == 1
+    assert stats["runs_last_hour"] == 1
+    assert stats["failures"] == 1
+    assert briefings.state["technology"].retry_interval > topic_briefings.BRIEFING_MIN_INTERVAL
@@ -0,0 +1,64 @@
+import numpy as np
+
+from pipeline.vector_store import VectorStore
+
+WORDS = ["bank", "market", "rates", "election", "launch", "storm"]
+
+
+class FakeEmbedder:
+    """Bag-of-words vectors over WORDS, L2-normalized like the real worker's."""
+
+    def is_ready(self):
+        return True
+
+    def encode(self, texts, priority=False):
+        vectors = np.array([[float(w in t.lower()) for w in WORDS] for t in texts], dtype=np.float32)
+        return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+
+def test_reader_sees_rows_appended_after_it_opened(tmp_path):
+    writer = VectorStore(tmp_path)
+    writer.embedder = FakeEmbedder()
+    writer.add_items([{"text": "Bank raises rates", "source": "gnews", "url": "https://a/1"}])
+
+    reader = VectorStore(tmp_path, read_only=True)
+    reader.embedder = FakeEmbedder()
+    assert [hit["url"] for hit in reader.search("rates", 5)] == ["https://a/1"]
+
+    # Enough rows to make the writer grow (and remap) its files
+    writer.add_items([{"text": f"Storm {i} hits coast", "source": "gnews", "url": f"https://b/{i}"}
+                      for i in range(1500)])
+    hits = reader.search("storm", 3)
+    assert reader.count() == 1501
+    assert len(hits) == 3 and all(hit["url"].startswith("https://b/") for hit in hits)
+    assert reader.add_items([{"text": "Election launch", "url": "https://c/1"}]) == 0
+
+
+def test_slow_vector_search_is_left_out_of_fusion(monkeypatch, tmp_path):
+    import threading
+
+    import data.database as database
+    import pipeline.gemini_rag as gemini_rag
+
+    release = threading.Event()
+
+    class SlowStore:
+        def count(self):
+            return 1
+
+        def search(self, query, k):
+            release.wait(5)
+            return [{"text": "Bank rates vector hit", "source": "vector", "url": "https://v/1"}]
+
+    monkeypatch.setattr(database, "DB_PATH", tmp_path / "archive.db")
+    monkeypatch.setattr(gemini_rag, "get_vector_store", lambda: SlowStore())
+    monkeypatch.setattr(gemini_rag, "VECTOR_SEARCH_TIMEOUT", 0.1)
+    database.init_db()
+
+    live = [{"text": "Bank raises rates", "source": "opml", "url": "https://a/1"}]
+    try:
+        retrieval = gemini_rag.retrieve_context(live, "bank rates", archive=[])
+    finally:
+        release.set()
+    urls = [item["url"] for item in retrieval["representatives"]]
+    assert urls == ["https://a/1"]